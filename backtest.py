@@ -0,0 +1,154 @@
+"""Offline backtesting - replays historical dates back-to-back on a simulated clock
+
+Usage: python trading_floor.py --backtest 2024-01-02 2024-03-29
+
+Traders must talk to a stub server (LLM_BASE_URL) or replay a cassette
+(LLM_CASSETTE=replay); a backtest against real providers makes an LLM call
+per trader, session and turn for every day, so it needs BACKTEST_LIVE_LLM=on.
+"""
+import asyncio
+import csv
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(__file__))
+from src.agents.cassette import cassette
+from src.agents.llm_clients import close_clients
+from src.agents.trader import LLM_BASE_URL
+from src.core import async_database, clock, database
+from src.core.accounts import Account, INITIAL_BALANCE
+
+BACKTEST_DB_PATH = Path(os.getenv("BACKTEST_DB_PATH", "data/backtest.db"))
+BACKTEST_OUTPUT_DIR = Path("data/backtest")
+BACKTEST_LIVE_LLM = os.getenv("BACKTEST_LIVE_LLM", "off").lower() == "on"  # allow real LLM providers
+
+# Simulated times of day for each session; traders alternate trade/rebalance
+SESSION_TIMES = [time(10, 0), time(15, 0)]
+MARK_TIME = time(16, 0)  # equity is marked at the close
+
+
+def trading_days(start: date, end: date) -> List[date]:
+    """Replay dates: stored market history if any, otherwise every weekday"""
+    stored = database.list_market_dates(start.isoformat(), end.isoformat())
+    if stored:
+        return [date.fromisoformat(d) for d in stored]
+    days = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def check_llm_offline():
+    """Refuse to backtest against real LLM providers unless BACKTEST_LIVE_LLM=on"""
+    if LLM_BASE_URL or cassette.mode == "replay" or BACKTEST_LIVE_LLM:
+        return
+    raise RuntimeError("Backtest would call real LLM providers for every trader, session and day. "
+                       "Set LLM_BASE_URL to a stub server, LLM_CASSETTE=replay to replay a recording, "
+                       "or BACKTEST_LIVE_LLM=on to call the providers anyway")
+
+
+def _prepare_database(start: date, end: date) -> Path:
+    """Point the database layer at a fresh backtest file seeded with market history"""
+    source = database.DB_PATH
+    database.flush_logs()
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{BACKTEST_DB_PATH}{suffix}").unlink(missing_ok=True)
+    database.DB_PATH = BACKTEST_DB_PATH
+    database.init_database()
+    copied = database.import_market_history(source, start.isoformat(), end.isoformat())
+    print(f"Backtest database {BACKTEST_DB_PATH}: {copied} stored prices for {start} → {end}")
+    return source
+
+
+def max_drawdown(values: List[float]) -> float:
+    """Largest peak-to-trough fall, as a fraction of the peak"""
+    peak, worst = float("-inf"), 0.0
+    for value in values:
+        peak = max(peak, value)
+        if peak > 0:
+            worst = max(worst, (peak - value) / peak)
+    return worst
+
+
+def write_equity_curves(curves: Dict[str, List[Tuple[str, float]]], start: date, end: date) -> Path:
+    """Save one column per trader, one row per marked close"""
+    BACKTEST_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    path = BACKTEST_OUTPUT_DIR / f"equity_{start}_{end}.csv"
+    names = list(curves)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", *names])
+        for i, (timestamp, _) in enumerate(curves[names[0]]):
+            writer.writerow([timestamp, *(f"{curves[name][i][1]:.2f}" for name in names)])
+    return path
+
+
+async def run_backtest(start: date, end: date, traders=None) -> Dict[str, List[Tuple[str, float]]]:
+    """Replay every trading day in [start, end] and return per-trader equity curves"""
+    from trading_floor import create_traders
+
+    if traders is None:
+        check_llm_offline()
+    source = _prepare_database(start, end)
+    try:
+        days = trading_days(start, end)
+        traders = traders or create_traders()
+        for trader in traders:
+            Account.get(trader.name).reset(trader.strategy)
+        curves: Dict[str, List[Tuple[str, float]]] = {trader.name: [] for trader in traders}
+
+        print(f"Replaying {len(days)} trading days with {len(traders)} traders")
+        started = datetime.now()
+        for day in days:
+            for session_time in SESSION_TIMES:
+                clock.set_time(datetime.combine(day, session_time))
+                await asyncio.gather(*[trader.run() for trader in traders])
+
+            clock.set_time(datetime.combine(day, MARK_TIME))
+            timestamp = clock.now().strftime("%Y-%m-%d %H:%M:%S")
+            for trader in traders:
+                account = await Account.aget(trader.name)
+                value = await account.acalculate_portfolio_value()
+                await async_database.awrite_portfolio_snapshot(trader.name, timestamp, value)
+                curves[trader.name].append((timestamp, value))
+            print(f"{day}: " + ", ".join(f"{name} ${curve[-1][1]:,.0f}" for name, curve in curves.items()))
+
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"\nBacktest finished in {elapsed:.1f}s ({elapsed / max(len(days), 1):.2f}s per simulated day)")
+        return curves
+    finally:
+        clock.reset()
+        await close_clients()
+        await async_database.close()
+        database.flush_logs()
+        database.DB_PATH = source
+
+
+def summarize(curves: Dict[str, List[Tuple[str, float]]]):
+    """Print final value, return and max drawdown per trader"""
+    print(f"\n{'trader':<10}{'final':>14}{'return':>10}{'max dd':>10}")
+    for name, curve in curves.items():
+        values = [value for _, value in curve]
+        if not values:
+            continue
+        final = values[-1]
+        print(f"{name:<10}{final:>14,.2f}{final / INITIAL_BALANCE - 1:>10.1%}{max_drawdown(values):>10.1%}")
+
+
+def main(start: str, end: str):
+    """CLI entry point"""
+    start_date, end_date = date.fromisoformat(start), date.fromisoformat(end)
+    try:
+        check_llm_offline()
+    except RuntimeError as e:
+        sys.exit(f"Backtest aborted: {e}")
+    curves = asyncio.run(run_backtest(start_date, end_date))
+    summarize(curves)
+    if curves and any(curves.values()):
+        print(f"\nEquity curves written to {write_equity_curves(curves, start_date, end_date)}")
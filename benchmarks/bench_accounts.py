@@ -0,0 +1,77 @@
+"""Benchmark: Account trade throughput vs history length, portfolio value vs holdings count
+
+Usage: python benchmarks/bench_accounts.py [--quick]
+
+Runs offline on a frozen simulated clock against a throwaway database.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_accounts_")) / "bench.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import measure, print_results
+from src.core import clock, database
+from src.core.accounts import Account
+from src.core.market import price_cache
+
+BENCH_TIME = datetime(2025, 3, 12, 11, 0)  # simulated prices only: no network, same numbers every run
+HISTORY_LENGTHS = [0, 100, 1_000, 10_000]
+HOLDINGS_COUNTS = [1, 10, 100, 1_000]
+
+
+def seed_account(name: str, history: int, holdings: int = 1) -> Account:
+    """Account with `history` past trades and `holdings` open positions"""
+    symbols = [f"SYM{i:04d}" for i in range(holdings)]
+    database.write_account(name, {
+        "balance": 1e12,
+        "strategy": "benchmark",
+        "holdings": {symbol: 10 for symbol in symbols},
+        "transactions": [
+            {"symbol": symbols[i % holdings], "quantity": 1, "price": 100.0,
+             "timestamp": "2025-03-11 10:00:00", "rationale": "seed"}
+            for i in range(history)
+        ],
+        "portfolio_value_time_series": [],
+    })
+    return Account.get(name)
+
+
+def run(quick: bool = False):
+    results = []
+    repeat = 3 if quick else 7
+    with clock.simulated_time(BENCH_TIME):
+        for history in HISTORY_LENGTHS[:3] if quick else HISTORY_LENGTHS:
+            account = seed_account(f"trades{history}", history)
+            results.append(measure(
+                "accounts.buy_shares", lambda: account.buy_shares("AAPL", 1, "bench"),
+                repeat=repeat, number=20, history=history))
+            results.append(measure(
+                "accounts.sell_shares", lambda: account.sell_shares("AAPL", 1, "bench"),
+                repeat=repeat, number=20, history=history))
+            # What a trader turn actually pays: load the account, then trade
+            results.append(measure(
+                "accounts.get_then_buy", lambda: Account.get(account.name).buy_shares("AAPL", 1, "bench"),
+                repeat=repeat, number=5, history=history))
+            results.append(measure(
+                "accounts.transactions_page", lambda: account.transactions_page(history // 2, 20),
+                repeat=repeat, number=20, history=history))
+
+        for holdings in HOLDINGS_COUNTS[:3] if quick else HOLDINGS_COUNTS:
+            account = seed_account(f"holdings{holdings}", 0, holdings)
+            results.append(measure(
+                "accounts.portfolio_value_cold", account.calculate_portfolio_value,
+                setup=price_cache.clear, repeat=repeat, holdings=holdings))
+            results.append(measure(
+                "accounts.portfolio_value_warm", account.calculate_portfolio_value,
+                repeat=repeat, number=20, holdings=holdings))
+    database.flush_logs()
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run("--quick" in sys.argv))
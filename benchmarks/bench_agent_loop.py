@@ -0,0 +1,103 @@
+"""Benchmark: SimpleTrader.run turn latency against the local LLM stub
+
+Usage: python benchmarks/bench_agent_loop.py [--quick]
+
+The stub answers instantly, so turn latency is the agent loop's own cost:
+request serialization, HTTP round trip, tool execution and DB writes.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_agent_")) / "bench.db"))
+os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from openai import AsyncOpenAI
+from harness import from_samples, print_results
+from src.agents.llm_clients import close_clients
+from src.agents.stub_server import start_stub_server
+from src.agents.trader import SimpleTrader
+from src.core import async_database, clock, database
+
+BENCH_TIME = datetime(2025, 3, 12, 11, 0)
+CONCURRENCY = [1, 16]
+
+
+class TurnTimer:
+    """Wraps chat.completions.create to timestamp every LLM call of a run"""
+
+    def __init__(self, create):
+        self._create = create
+        self.starts = []
+        self.llm = []
+
+    async def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        self.starts.append(start)
+        try:
+            return await self._create(*args, **kwargs)
+        finally:
+            self.llm.append(time.perf_counter() - start)
+
+    def turns(self, end: float):
+        """Per-turn latency: from one LLM call to the next (or to the end of the run)"""
+        bounds = self.starts + [end]
+        return [b - a for a, b in zip(bounds, bounds[1:])]
+
+
+async def run_traders(base_url: str, count: int, sessions: int):
+    traders = [SimpleTrader(f"agent{count}_{i}", "openai/gpt-4o-mini") for i in range(count)]
+    turns, overhead, runs = [], [], []
+    for trader in traders:
+        trader.client = AsyncOpenAI(base_url=base_url, api_key="stub")
+    for _ in range(sessions):
+        timers = []
+        for trader in traders:
+            timer = TurnTimer(trader.client.chat.completions.create)
+            trader.client.chat.completions.create = timer
+            timers.append(timer)
+
+        async def timed_run(trader):
+            start = time.perf_counter()
+            await trader.run()
+            return start, time.perf_counter()
+
+        for timer, (start, end) in zip(timers, await asyncio.gather(*[timed_run(t) for t in traders])):
+            runs.append(end - start)
+            per_turn = timer.turns(end)
+            turns.extend(per_turn)
+            overhead.extend(t - llm for t, llm in zip(per_turn, timer.llm))
+    for trader in traders:
+        await trader.client.close()
+    await close_clients()
+    await async_database.close()
+    return turns, overhead, runs
+
+
+def run(quick: bool = False):
+    server, base_url = start_stub_server()
+    sessions = 2 if quick else 5
+    results = []
+    try:
+        with clock.simulated_time(BENCH_TIME), contextlib.redirect_stdout(io.StringIO()):
+            for count in CONCURRENCY:
+                turns, overhead, runs = asyncio.run(run_traders(base_url, count, sessions))
+                results.append(from_samples("agent.turn_latency", turns, traders=count))
+                results.append(from_samples("agent.turn_overhead", overhead, traders=count))
+                results.append(from_samples("agent.run", runs, traders=count))
+    finally:
+        server.shutdown()
+        database.flush_logs()
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run("--quick" in sys.argv))
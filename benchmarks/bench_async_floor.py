@@ -0,0 +1,136 @@
+"""Benchmark: trading-floor session wall time with blocking vs async persistence
+
+Usage: python benchmarks/bench_async_floor.py [--quick] [llm_latency_ms]
+
+Each trader talks to an in-process fake LLM that sleeps for the given latency
+(default 20 ms) and scripts one turn of get_account + buy_shares before
+finishing, so the numbers isolate how much DB I/O stalls the event loop. The
+blocking baseline overrides every async Account method with its sync twin,
+so nothing in it leaves the event loop thread.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_floor_")) / "floor.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import measure, print_results
+from openai.types.chat import ChatCompletion
+from src.agents.llm_clients import close_clients
+from src.agents.trader import SimpleTrader
+from src.core import async_database, database
+from src.core.accounts import Account
+
+TRADER_COUNTS = [4, 32, 256]
+LLM_LATENCY_MS = 20.0
+
+
+class FakeCompletions:
+    """Scripted chat.completions endpoint: tool calls on turn one, then a summary"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, model, messages, **kwargs):
+        await asyncio.sleep(self.latency)
+        turn = sum(1 for m in messages if m["role"] == "assistant")
+        if turn == 0:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_1", "type": "function",
+                 "function": {"name": "get_account", "arguments": "{}"}},
+                {"id": "call_2", "type": "function",
+                 "function": {"name": "buy_shares", "arguments": json.dumps(
+                     {"symbol": "AAPL", "quantity": 1, "rationale": "benchmark"})}},
+            ]}
+        else:
+            message = {"role": "assistant", "content": "Bought 1 AAPL."}
+        return ChatCompletion.model_validate({
+            "id": "bench", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        })
+
+
+class FakeClient:
+    def __init__(self, latency: float):
+        self.chat = type("Chat", (), {"completions": FakeCompletions(latency)})()
+
+
+class BlockingAccount(Account):
+    """The pre-async behaviour: every async twin runs its sync method inside the coroutine"""
+
+    @classmethod
+    async def aget(cls, name):
+        return cls.get(name)
+
+    async def asave(self):
+        self.save()
+
+    async def abuy_shares(self, symbol, quantity, rationale):
+        return self.buy_shares(symbol, quantity, rationale)
+
+    async def asell_shares(self, symbol, quantity, rationale):
+        return self.sell_shares(symbol, quantity, rationale)
+
+    async def acalculate_portfolio_value(self):
+        return self.calculate_portfolio_value()
+
+    async def atransactions_page(self, offset=0, limit=20):
+        return self.transactions_page(offset, limit)
+
+    async def areport(self):
+        return self.report()
+
+    async def asummary(self):
+        return self.summary()
+
+    async def achange_strategy(self, strategy):
+        return self.change_strategy(strategy)
+
+    async def aset_model(self, model):
+        self.set_model(model)
+
+
+class BlockingTrader(SimpleTrader):
+    async def load_account(self):
+        self.account = await BlockingAccount.aget(self.name)
+        if not self.account.strategy:
+            await self.account.achange_strategy("benchmark")
+        if self.account.model != self.model_name:
+            await self.account.aset_model(self.model_name)
+        return self.account
+
+
+async def run_floor(trader_cls, count: int, latency: float) -> float:
+    traders = [trader_cls(f"bench{i}", "openai/gpt-4o-mini") for i in range(count)]
+    for trader in traders:
+        trader.client = FakeClient(latency)
+    start = time.perf_counter()
+    await asyncio.gather(*[trader.run(max_turns=3) for trader in traders])
+    elapsed = time.perf_counter() - start
+    await close_clients()
+    await async_database.close()
+    return elapsed
+
+
+def run(quick: bool = False, latency_ms: float = LLM_LATENCY_MS):
+    results = []
+    latency = latency_ms / 1000
+    for count in TRADER_COUNTS[:2] if quick else TRADER_COUNTS:
+        for label, trader_cls in (("blocking", BlockingTrader), ("async", SimpleTrader)):
+            results.append(measure(
+                f"async_floor.{label}", lambda: asyncio.run(run_floor(trader_cls, count, latency)),
+                repeat=3 if quick else 5, traders=count, latency_ms=latency_ms))
+    database.flush_logs()
+    return results
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--quick"]
+    print_results(run("--quick" in sys.argv, float(args[0]) if args else LLM_LATENCY_MS))
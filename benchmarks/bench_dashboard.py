@@ -0,0 +1,80 @@
+"""Benchmark: TraderView refresh time vs account history size
+
+Usage: python benchmarks/bench_dashboard.py [--quick]
+
+Times what one trader tab costs per refresh (reload plus all five components),
+and the change-aware refresh when nothing has moved.
+Needs gradio, like dashboard.py itself.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_dash_")) / "bench.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import measure, print_results
+from src.core import clock, database
+
+BENCH_TIME = datetime(2025, 3, 12, 11, 0)
+HISTORY_SIZES = [10, 1_000, 10_000]  # trades and portfolio snapshots per account
+COMPONENTS = ["get_portfolio_value_html", "get_portfolio_chart", "get_logs_html",
+              "get_holdings_df", "get_transactions_df"]
+
+
+def seed_history(name: str, size: int):
+    start = BENCH_TIME - timedelta(hours=size)
+    symbols = [f"SYM{i:02d}" for i in range(20)]
+    database.write_account(name, {
+        "balance": 5000.0,
+        "strategy": "benchmark",
+        "holdings": {symbol: 5 for symbol in symbols},
+        "transactions": [
+            {"symbol": symbols[i % 20], "quantity": 1, "price": 100.0,
+             "timestamp": (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"), "rationale": "seed"}
+            for i in range(size)
+        ],
+        "portfolio_value_time_series": [
+            ((start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"), 10000.0 + i) for i in range(size)
+        ],
+    })
+    for i in range(min(size, 200)):
+        database.write_log(name, "agent", f"seed log line {i}")
+    database.flush_logs()
+
+
+def run(quick: bool = False):
+    try:
+        from dashboard import TraderView
+    except ImportError as e:
+        return [{"name": "dashboard.refresh", "params": {}, "skipped": str(e)}]
+
+    results = []
+    repeat = 3 if quick else 7
+    with clock.simulated_time(BENCH_TIME):
+        for size in HISTORY_SIZES[:2] if quick else HISTORY_SIZES:
+            name = f"view{size}"
+            seed_history(name, size)
+            view = TraderView(name, "benchmark")
+
+            def refresh():
+                view.reload()
+                return [getattr(view, component)() for component in COMPONENTS]
+
+            results.append(measure("dashboard.refresh", refresh, repeat=repeat, history=size))
+            # The auto-refresh path when nothing changed: version check, no re-render
+            view.refresh(force=True)
+            results.append(measure("dashboard.refresh_unchanged", view.refresh, repeat=repeat, number=20,
+                                   history=size))
+            results.append(measure("dashboard.reload", view.reload, repeat=repeat, history=size))
+            for component in COMPONENTS:
+                results.append(measure(f"dashboard.{component}", getattr(view, component),
+                                       repeat=repeat, history=size))
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run("--quick" in sys.argv))
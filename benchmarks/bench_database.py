@@ -0,0 +1,130 @@
+"""Micro-benchmark: connect-per-call vs pooled WAL connections in src/core/database.py
+
+Usage: python benchmarks/bench_database.py [iterations]
+
+Runs against throwaway databases in a temp directory, never data/trading.db.
+"""
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+TMP_DIR = Path(tempfile.mkdtemp(prefix="bench_db_"))
+os.environ["TRADING_DB_PATH"] = str(TMP_DIR / "pooled.db")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import database
+from src.core.logs import search_logs
+
+LEGACY_PATH = TMP_DIR / "legacy.db"
+
+ACCOUNT = {
+    "name": "warren",
+    "balance": 10000.0,
+    "strategy": "Value investing",
+    "holdings": {"AAPL": 10, "KO": 25},
+    "transactions": [],
+    "portfolio_value_time_series": [],
+}
+
+
+# Baseline: the original open/commit/close-per-call implementation
+def legacy_init():
+    conn = sqlite3.connect(LEGACY_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    conn.execute("""CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+        timestamp TEXT NOT NULL, type TEXT NOT NULL, message TEXT NOT NULL)""")
+    conn.commit()
+    conn.close()
+
+
+def legacy_write_account(name, data):
+    conn = sqlite3.connect(LEGACY_PATH)
+    conn.execute("INSERT OR REPLACE INTO accounts (name, data) VALUES (?, ?)", (name, json.dumps(data)))
+    conn.commit()
+    conn.close()
+
+
+def legacy_read_account(name):
+    conn = sqlite3.connect(LEGACY_PATH)
+    row = conn.execute("SELECT data FROM accounts WHERE name = ?", (name,)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def legacy_write_log(name, log_type, message):
+    conn = sqlite3.connect(LEGACY_PATH)
+    conn.execute(
+        "INSERT INTO logs (name, timestamp, type, message) VALUES (?, ?, ?, ?)",
+        (name, datetime.now().strftime("%H:%M:%S"), log_type, message)
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_read_log(name, last_n=10):
+    conn = sqlite3.connect(LEGACY_PATH)
+    rows = conn.execute(
+        "SELECT timestamp, type, message FROM logs WHERE name = ? ORDER BY id DESC LIMIT ?",
+        (name, last_n)
+    ).fetchall()
+    conn.close()
+    return list(reversed(rows))
+
+
+def legacy_search_log(text, limit=100):
+    conn = sqlite3.connect(LEGACY_PATH)
+    rows = conn.execute(
+        "SELECT id, name, timestamp, type, message FROM logs WHERE message LIKE ? ORDER BY id DESC LIMIT ?",
+        (f"%{text}%", limit)
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def ops_per_sec(fn, iterations: int) -> float:
+    """Time fn() over a number of iterations, including draining queued log writes"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    database.flush_logs()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    legacy_init()
+
+    cases = [
+        ("write_account",
+         lambda: legacy_write_account("warren", ACCOUNT),
+         lambda: database.write_account("warren", ACCOUNT)),
+        ("read_account",
+         lambda: legacy_read_account("warren"),
+         lambda: database.read_account("warren")),
+        ("write_log",
+         lambda: legacy_write_log("warren", "account", "Bought 10 AAPL @ $190.00"),
+         lambda: database.write_log("warren", "account", "Bought 10 AAPL @ $190.00")),
+        ("read_log",
+         lambda: legacy_read_log("warren", 20),
+         lambda: database.read_log("warren", 20)),
+        # A term no line mentions: the LIKE scan reads every row, the index answers directly
+        ("search_log",
+         lambda: legacy_search_log("NVDA"),
+         lambda: search_logs("NVDA")),
+    ]
+
+    print(f"{'operation':<16}{'before ops/s':>14}{'after ops/s':>14}{'speedup':>10}")
+    for name, before, after in cases:
+        before_rate = ops_per_sec(before, iterations)
+        after_rate = ops_per_sec(after, iterations)
+        print(f"{name:<16}{before_rate:>14,.0f}{after_rate:>14,.0f}{after_rate / before_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: leaderboard query time vs number of traders and trade history
+
+Usage: python benchmarks/bench_leaderboard.py [--quick]
+
+Compares ranking traders by loading every account (Account.get plus a
+portfolio valuation each) with trader_leaderboard() and model_leaderboard(),
+which aggregate the accounts and holdings tables in SQL.
+"""
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_leaderboard_")) / "bench.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import measure, print_results
+from src.core import database
+from src.core.accounts import Account
+from src.core.leaderboard import model_leaderboard, trader_leaderboard
+
+# (traders, trades per trader)
+SIZES = [(100, 100), (1_000, 100), (5_000, 200)]
+LOAD_ALL_LIMIT = 1_000  # loading every account gets too slow to measure beyond this
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "AMD", "NFLX", "INTC"]
+MODELS = ["gpt-4o-mini", "gemini-2.0-flash", "deepseek-chat", "llama-3.3-70b"]
+
+
+def seed_traders(traders: int, trades: int):
+    """Accounts with running stats, 3 open positions each and a trade history, written in bulk"""
+    rng = random.Random(traders)
+    with database.transaction() as conn:
+        for table in ("accounts", "holdings", "transactions"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.executemany(
+            "INSERT INTO accounts (name, balance, strategy, model, realized_pnl, trade_count, buy_count, "
+            "sell_count, bought_value, sold_value, winning_sells) VALUES (?, ?, '', ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(f"trader{i}", rng.uniform(1000, 9000), MODELS[i % len(MODELS)], rng.uniform(-500, 500),
+              trades, trades // 2, trades // 2, trades * 500.0, trades * 480.0, rng.randrange(trades // 2))
+             for i in range(traders)]
+        )
+        conn.executemany(
+            "INSERT INTO holdings (name, symbol, quantity, avg_cost) VALUES (?, ?, ?, ?)",
+            [(f"trader{i}", symbol, rng.randrange(1, 20), rng.uniform(50, 500))
+             for i in range(traders) for symbol in rng.sample(SYMBOLS, 3)]
+        )
+        conn.executemany(
+            "INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale, realized_pnl) "
+            "VALUES (?, ?, ?, ?, '2025-01-01 10:00:00', '', 0)",
+            ((f"trader{i}", SYMBOLS[j % len(SYMBOLS)], 1 if j % 2 else -1, 100.0)
+             for i in range(traders) for j in range(trades))
+        )
+
+
+def load_all(traders: int):
+    """Rank by return the old way: every account loaded and valued in Python"""
+    values = []
+    for i in range(traders):
+        account = Account.get(f"trader{i}")
+        values.append((account.calculate_portfolio_value(), account.name))
+    return sorted(values, reverse=True)[:50]
+
+
+def run(quick: bool = False):
+    results = []
+    repeat = 3 if quick else 5
+    for traders, trades in SIZES[:2] if quick else SIZES:
+        seed_traders(traders, trades)
+        params = {"traders": traders, "transactions": traders * trades}
+        if traders <= LOAD_ALL_LIMIT:
+            results.append(measure("leaderboard.load_all_accounts", lambda: load_all(traders), repeat=repeat,
+                                   **params))
+        results.append(measure("leaderboard.traders", trader_leaderboard, repeat=repeat, **params))
+        results.append(measure("leaderboard.models", model_leaderboard, repeat=repeat, **params))
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run("--quick" in sys.argv))
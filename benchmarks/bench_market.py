@@ -0,0 +1,47 @@
+"""Benchmark: stored market snapshot reads and simulated price generation
+
+Usage: python benchmarks/bench_market.py [--quick]
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_market_")) / "bench.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import measure, print_results
+from src.core import database
+from src.core.simulator import SimulatedMarket
+
+UNIVERSE_SIZES = [100, 1_000, 10_000]  # a full Polygon EOD snapshot is ~10k symbols
+BENCH_TIME = datetime(2025, 3, 12, 11, 0)
+
+
+def run(quick: bool = False):
+    results = []
+    repeat = 3 if quick else 7
+    for size in UNIVERSE_SIZES:
+        day = f"2025-01-{UNIVERSE_SIZES.index(size) + 1:02d}"
+        symbols = [f"SYM{i:05d}" for i in range(size)]
+        database.write_market(day, {symbol: 100.0 + i / 100 for i, symbol in enumerate(symbols)})
+        results.append(measure("market.read_market", lambda: database.read_market(day),
+                               repeat=repeat, symbols=size))
+        results.append(measure("market.read_market_prices_10", lambda: database.read_market_prices(day, symbols[:10]),
+                               repeat=repeat, number=50, symbols=size))
+        if not quick or size <= 1_000:
+            # Fresh market each round so every path is generated, not served from its LRU
+            market = None
+
+            def fresh():
+                nonlocal market
+                market = SimulatedMarket(cache_size=0)
+            results.append(measure("market.simulated_prices_cold", lambda: market.prices(symbols, BENCH_TIME),
+                                   setup=fresh, repeat=repeat, symbols=size))
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run("--quick" in sys.argv))
@@ -0,0 +1,55 @@
+"""Load test: run N SimpleTraders against the local LLM stub server
+
+Usage: python benchmarks/bench_stub_floor.py [traders] [latency spec]
+       e.g. python benchmarks/bench_stub_floor.py 300 lognormal:-1.5,0.5
+
+Starts the stub in-process unless LLM_BASE_URL already points at one.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.agents.stub_server import StubBackend, parse_latency, start_stub_server
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_stub_")) / "floor.db"))
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+latency = sys.argv[2] if len(sys.argv) > 2 else "fixed:0.2"
+
+backend = None
+if not os.getenv("LLM_BASE_URL"):
+    backend = StubBackend(latency=parse_latency(latency, seed=0))
+    _, os.environ["LLM_BASE_URL"] = start_stub_server(backend=backend)
+
+from src.agents.llm_clients import close_clients, connection_stats
+from src.agents.trader import SimpleTrader
+from src.core import async_database, database
+
+
+async def run_floor():
+    traders = [SimpleTrader(f"stub{i:04d}", "openai/gpt-4o-mini") for i in range(count)]
+    start = time.perf_counter()
+    await asyncio.gather(*[trader.run() for trader in traders])
+    elapsed = time.perf_counter() - start
+    await close_clients()
+    await async_database.close()
+    return elapsed
+
+
+def main():
+    elapsed = asyncio.run(run_floor())
+    database.flush_logs()
+    print(f"{count} traders, latency {latency}: session wall time {elapsed:.2f}s")
+    if backend:
+        stats = backend.stats()
+        print(f"LLM requests {stats['requests']} ({stats['requests'] / elapsed:.0f}/s), "
+              f"max in flight {stats['max_in_flight']}")
+    for endpoint, conn in connection_stats().items():
+        print(f"{endpoint}: {conn['connections']} connections, {conn['reuse_rate']:.0%} reused")
+
+
+if __name__ == "__main__":
+    main()
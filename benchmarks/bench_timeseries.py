@@ -0,0 +1,55 @@
+"""Benchmark: portfolio chart series read time vs value history length
+
+Usage: python benchmarks/bench_timeseries.py [--quick]
+
+Compares loading every stored snapshot (what the chart used to plot) with
+read_series(), which serves a bounded, downsampled series from the rollups.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("TRADING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="bench_series_")) / "bench.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import measure, print_results
+from src.core import database
+from src.core.timeseries import read_series
+
+HISTORY_SIZES = [1_000, 10_000, 100_000]  # one snapshot per simulated minute
+START = datetime(2025, 1, 1)
+
+
+def seed_series(name: str, size: int):
+    database.write_account(name, {
+        "balance": 10000.0,
+        "holdings": {},
+        "transactions": [],
+        "portfolio_value_time_series": [
+            ((START + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"), 10000.0 + (i % 997)) for i in range(size)
+        ],
+    })
+
+
+def read_all(name: str):
+    return database.get_connection().execute(
+        "SELECT timestamp, value FROM portfolio_snapshots WHERE name = ? ORDER BY id", (name,)
+    ).fetchall()
+
+
+def run(quick: bool = False):
+    results = []
+    repeat = 3 if quick else 7
+    for size in HISTORY_SIZES[:2] if quick else HISTORY_SIZES:
+        name = f"series{size}"
+        seed_series(name, size)
+        results.append(measure("timeseries.read_all_snapshots", lambda: read_all(name), repeat=repeat, history=size))
+        results.append(measure("timeseries.read_series", lambda: read_series(name), repeat=repeat, history=size))
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run("--quick" in sys.argv))
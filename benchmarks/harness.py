@@ -0,0 +1,131 @@
+"""Shared timing and result plumbing for the benchmark suite
+
+Each bench module exposes run(quick) -> List[dict] built with measure(); run_all.py
+collects them into one JSON file and compare() diffs two such files.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize_samples(samples: List[float]) -> Dict[str, float]:
+    """Per-call seconds -> min/median/mean/p95 and ops/s"""
+    median = statistics.median(samples)
+    return {
+        "samples": len(samples),
+        "min_s": min(samples),
+        "median_s": median,
+        "mean_s": statistics.fmean(samples),
+        "p95_s": percentile(samples, 95),
+        "ops_per_s": 1.0 / median if median > 0 else float("inf"),
+    }
+
+
+def measure(name: str, fn: Callable[[], Any], repeat: int = 5, number: int = 1,
+            setup: Optional[Callable[[], Any]] = None, warmup: int = 1, **params) -> Dict[str, Any]:
+    """Time fn() in `repeat` rounds of `number` calls; setup() runs untimed before each round"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"name": name, "params": params, **summarize_samples(samples)}
+
+
+def from_samples(name: str, samples: List[float], **params) -> Dict[str, Any]:
+    """Result row for latencies collected elsewhere (e.g. per LLM turn)"""
+    return {"name": name, "params": params, **summarize_samples(samples)}
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """Stable identity of a result row across runs"""
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def environment() -> Dict[str, str]:
+    """Where the numbers came from"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def save(results: List[Dict[str, Any]], path: Path = None) -> Path:
+    """Write a results file (default: benchmarks/results/<timestamp>.json)"""
+    env = environment()
+    if path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{env['timestamp'].replace(':', '')}_{env['commit'] or 'nogit'}.json"
+    with open(path, "w") as f:
+        json.dump({"environment": env, "results": results}, f, indent=2)
+    return path
+
+
+def load(path: Path) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]],
+            threshold: float = 0.10) -> List[str]:
+    """Print median deltas per result; returns the keys that got slower by more than threshold"""
+    before = {result_key(r): r for r in baseline if "skipped" not in r}
+    regressions = []
+    print(f"{'benchmark':<58}{'before ms':>11}{'after ms':>11}{'change':>9}")
+    for result in current:
+        key = result_key(result)
+        if "skipped" in result:
+            print(f"{key:<58}skipped: {result['skipped']}")
+            continue
+        old = before.get(key)
+        if old is None:
+            print(f"{key:<58}{'-':>11}{result['median_s'] * 1000:>11.3f}{'new':>9}")
+            continue
+        change = result["median_s"] / old["median_s"] - 1 if old["median_s"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  <-- slower"
+        print(f"{key:<58}{old['median_s'] * 1000:>11.3f}{result['median_s'] * 1000:>11.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """Human-readable table of result rows"""
+    for result in results:
+        if "skipped" in result:
+            print(f"{result_key(result):<58}skipped: {result['skipped']}")
+            continue
+        print(f"{result_key(result):<58}{result['median_s'] * 1000:>11.3f} ms"
+              f"{result['p95_s'] * 1000:>11.3f} ms p95{result['ops_per_s']:>12,.0f}/s")
@@ -0,0 +1,63 @@
+"""Run the whole benchmark suite and save machine-readable results
+
+Usage:
+    python benchmarks/run_all.py [--quick] [--only accounts,market] [--output FILE]
+    python benchmarks/run_all.py --compare benchmarks/results/<baseline>.json [--threshold 0.1]
+    python benchmarks/run_all.py --diff BASELINE.json CURRENT.json
+
+Results go to benchmarks/results/<timestamp>_<commit>.json. With --compare the
+fresh run is diffed against a baseline and the exit code is 1 if any median got
+slower than the threshold.
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# One throwaway database for every suite, set before anything imports src.core
+os.environ["TRADING_DB_PATH"] = str(Path(tempfile.mkdtemp(prefix="bench_suite_")) / "bench.db")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+SUITES = ["accounts", "market", "agent_loop", "async_floor", "dashboard", "timeseries", "leaderboard"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and rounds")
+    parser.add_argument("--only", help="comma-separated subset of: " + ", ".join(SUITES))
+    parser.add_argument("--output", type=Path, help="results file (default benchmarks/results/...)")
+    parser.add_argument("--compare", type=Path, help="baseline results file to diff against")
+    parser.add_argument("--diff", nargs=2, type=Path, metavar=("BASELINE", "CURRENT"),
+                        help="diff two saved results files without running anything")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed median slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.diff:
+        regressions = harness.compare(harness.load(args.diff[0]), harness.load(args.diff[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = []
+    for suite in args.only.split(",") if args.only else SUITES:
+        print(f"== {suite}")
+        module = importlib.import_module(f"bench_{suite}")
+        suite_results = module.run(quick=args.quick)
+        harness.print_results(suite_results)
+        results.extend(suite_results)
+
+    path = harness.save(results, args.output)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        print()
+        regressions = harness.compare(harness.load(args.compare), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,36 @@
 """Enhanced Gradio dashboard with all features from course project"""
+import asyncio
 import gradio as gr
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import sys
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(__file__))
 from src.core.accounts import Account
-from src.core.database import read_log
+from src.core.database import read_log, read_versions
+from src.core.events import event_bus
+from src.core.leaderboard import model_leaderboard, trader_leaderboard
+from src.core.logs import search_logs
+from session_runner import SessionBusy, runner
+from src.core.timeseries import read_series
+
+
+COMPONENTS = ("portfolio", "chart", "logs", "holdings", "transactions")
+STREAM_HEARTBEAT = 30  # seconds between full checks when no event arrives (prices still drift)
+PROGRESS_INTERVAL = 1.0  # seconds between session progress updates
+LOG_COLORS = {
+    "agent": "#00bcd4",
+    "function": "#4caf50",
+    "response": "#ff4081",
+    "account": "#f44336",
+    "error": "#ff5722"
+}
 
 
 class TraderView:
@@ -19,14 +40,80 @@ class TraderView:
         self.name = name
         self.model_name = model_name
         self.account = Account.get(name)
+        self.versions = None  # (account version, log id) the loaded account and logs reflect
+        self._snapshot = {}  # component -> (inputs, rendered value) as of the last render
+        self._lock = threading.Lock()  # live clients and refresh buttons call in from their own threads
+        self.refresh_stats = {"refreshes": 0, "rebuilt": 0, "skipped": 0, "seconds": 0.0, "last_ms": 0.0}
     
     def reload(self):
         """Refresh account data"""
         self.account = Account.get(self.name)
     
+    def _renderers(self):
+        return {
+            "portfolio": self.get_portfolio_value_html,
+            "chart": self.get_portfolio_chart,
+            "logs": self.get_logs_html,
+            "holdings": self.get_holdings_df,
+            "transactions": self.get_transactions_df,
+        }
+    
+    def _render(self, versions, force: bool):
+        """Bring the snapshot up to date (caller holds the lock); returns the previous one"""
+        start = time.perf_counter()
+        versions = versions or read_versions([self.name])[self.name.lower()]
+        if force or versions[0] != (self.versions or (None,))[0]:
+            self.reload()
+        self.versions = versions
+        account_version, log_version = versions
+        # Cached prices: only moved positions are re-marked, no database reads
+        value = self.account.calculate_portfolio_value()
+        keys = {
+            "portfolio": (account_version, value),
+            "chart": account_version,
+            "logs": log_version,
+            "holdings": (account_version, value),
+            "transactions": account_version,
+        }
+        previous, snapshot = self._snapshot, {}
+        for component, render in self._renderers().items():
+            if not force and component in previous and previous[component][0] == keys[component]:
+                snapshot[component] = previous[component]
+                self.refresh_stats["skipped"] += 1
+            else:
+                snapshot[component] = (keys[component], render())
+                self.refresh_stats["rebuilt"] += 1
+        self._snapshot = snapshot
+        elapsed = time.perf_counter() - start
+        self.refresh_stats["refreshes"] += 1
+        self.refresh_stats["seconds"] += elapsed
+        self.refresh_stats["last_ms"] = elapsed * 1000
+        return previous
+    
+    def snapshot(self, versions=None):
+        """Every component as (inputs, rendered value), re-rendering only those whose inputs changed
+
+        Each call returns a new dict that is never modified afterwards, so a
+        live client can compare the inputs with what it last displayed and
+        send the values without holding the view's lock.
+        """
+        with self._lock:
+            self._render(versions, force=False)
+            return self._snapshot
+    
+    def refresh(self, versions=None, force: bool = False):
+        """Re-render only the components whose inputs changed; unchanged ones come back as None"""
+        with self._lock:
+            previous = self._render(versions, force)
+            return {
+                component: None if previous.get(component) is entry else entry[1]
+                for component, entry in self._snapshot.items()
+            }
+    
     def get_portfolio_chart(self):
-        """Generate portfolio value time series chart"""
-        if not self.account.portfolio_value_time_series:
+        """Generate portfolio value time series chart from a bounded, downsampled series"""
+        _, points = read_series(self.name)
+        if not points:
             fig = go.Figure()
             fig.add_annotation(
                 text="No trading data yet",
@@ -41,10 +128,7 @@ class TraderView:
             )
             return fig
         
-        df = pd.DataFrame(
-            self.account.portfolio_value_time_series,
-            columns=["datetime", "value"]
-        )
+        df = pd.DataFrame(points, columns=["datetime", "value"])
         df["datetime"] = pd.to_datetime(df["datetime"])
         
         fig = px.line(df, x="datetime", y="value", title=f"{self.name}'s Portfolio")
@@ -77,6 +161,7 @@ class TraderView:
             <p style='color: #ddd; margin: 3px 0; font-size: 12px;'>{self.model_name}</p>
             <h2 style='color: white; margin: 8px 0; font-size: 24px;'>${portfolio_value:,.2f}</h2>
             <p style='color: {color}; font-size: 16px; margin: 0;'>{emoji} ${abs(pnl):,.2f} ({(pnl/10000)*100:+.1f}%)</p>
+            <p style='color: #ddd; margin: 3px 0 0; font-size: 11px;'>Realized ${self.account.realized_pnl:+,.2f} · Unrealized ${self.account.unrealized_pnl():+,.2f}</p>
         </div>
         """
     
@@ -85,15 +170,16 @@ class TraderView:
         if not self.account.holdings:
             return pd.DataFrame(columns=["Symbol", "Shares"])
         
-        from src.core.market import get_share_price
         return pd.DataFrame([
             {
-                "Symbol": symbol, 
-                "Shares": qty,
-                "Price": f"${get_share_price(symbol):.2f}",
-                "Value": f"${get_share_price(symbol) * qty:,.2f}"
+                "Symbol": p["symbol"], 
+                "Shares": p["quantity"],
+                "Avg Cost": f"${p['avg_cost']:.2f}",
+                "Price": f"${p['price']:.2f}",
+                "Value": f"${p['market_value']:,.2f}",
+                "Unrealized": f"${p['unrealized_pnl']:+,.2f}"
             }
-            for symbol, qty in self.account.holdings.items()
+            for p in self.account.positions()
         ])
     
     def get_transactions_df(self):
@@ -115,22 +201,158 @@ class TraderView:
         """Get colored activity logs"""
         logs = read_log(self.name, last_n=20)
         
-        colors = {
-            "agent": "#00bcd4",
-            "function": "#4caf50",
-            "response": "#ff4081",
-            "account": "#f44336",
-            "error": "#ff5722"
-        }
-        
         html = "<div style='height: 150px; overflow-y: auto; background: #1a1a1a; padding: 8px; border-radius: 5px; font-family: monospace;'>"
         for timestamp, log_type, message in logs:
-            color = colors.get(log_type, "#ffffff")
-            html += f"<p style='color: {color}; margin: 2px 0; font-size: 11px;'>{timestamp} [{log_type}] {message[:80]}</p>"
+            color = LOG_COLORS.get(log_type, "#ffffff")
+            html += f"<p style='color: {color}; margin: 2px 0; font-size: 11px;'>{timestamp.split()[-1]} [{log_type}] {message[:80]}</p>"
         html += "</div>"
         return html
 
 
+class LiveFeed:
+    """One render thread shared by every live client
+
+    The thread sleeps on the event bus, re-renders the traders named by each
+    batch of events (all of them after a quiet STREAM_HEARTBEAT, since prices
+    still drift) and publishes their snapshots to the event loop. Each client
+    is an async generator awaiting the next publication, so an open tab holds
+    no thread and renders nothing itself.
+    """
+    
+    def __init__(self, views):
+        self.views = {view.name: view for view in views}
+        self.snapshots = {}  # trader -> latest TraderView.snapshot(); replaced, never modified
+        self.generation = 0  # publications so far
+        self.last_ms = 0.0  # render time of the latest publication
+        self.stats = {"publications": 0, "renders": 0, "errors": 0}
+        self._loop = None
+        self._published = None  # asyncio.Event set (then replaced) by each publication
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        """Start the render thread, publishing to the calling event loop (Gradio runs one)"""
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.get_running_loop()
+                self._published = asyncio.Event()
+                self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+                self._thread.start()
+    
+    def _wait_for_changes(self, subscription):
+        """Traders named by the next batch of events (all of them after a quiet heartbeat)"""
+        by_name = {name.lower(): name for name in self.views}
+        try:
+            events = list(subscription.get(timeout=STREAM_HEARTBEAT))
+        except queue.Empty:
+            return set(self.views)
+        while not subscription.empty():
+            events.extend(subscription.get_nowait())
+        return {by_name[e.name] for e in events if e.name in by_name}
+    
+    def _run(self):
+        subscription = event_bus.subscribe()
+        changed = set(self.views)  # the first publication brings clients up to date
+        try:
+            while True:
+                if changed:
+                    try:
+                        snapshots, elapsed = self._render(changed)
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        print(f"Live feed render failed: {e}")
+                    else:
+                        try:
+                            self._loop.call_soon_threadsafe(self._publish, snapshots, elapsed)
+                        except RuntimeError:
+                            return  # the event loop has closed
+                changed = self._wait_for_changes(subscription)
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    def _render(self, changed):
+        start = time.perf_counter()
+        versions = read_versions(list(changed))
+        snapshots = dict(self.snapshots)
+        for name in changed:
+            snapshots[name] = self.views[name].snapshot(versions[name.lower()])
+        self.stats["renders"] += len(changed)
+        return snapshots, (time.perf_counter() - start) * 1000
+    
+    def _publish(self, snapshots, elapsed_ms: float):
+        """Runs on the event loop: swap in the new snapshots and wake every waiting client"""
+        self.snapshots, self.last_ms = snapshots, elapsed_ms
+        self.generation += 1
+        self.stats["publications"] += 1
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+    
+    async def updates(self):
+        """(snapshots, render ms) for the latest publication, then again after each new one"""
+        self._start()
+        generation = 0
+        while True:
+            if self.generation == generation:
+                await self._published.wait()
+                continue
+            generation = self.generation
+            yield self.snapshots, self.last_ms
+
+
+def session_progress_markdown(progress) -> str:
+    """Status line plus one row per trader for a session job"""
+    icons = {"running": "🔄", "done": "✅", "error": "❌"}
+    status = {"running": "Trading in progress", "done": "Complete! Data updated.", "error": "Error"}
+    lines = [f"**Status:** {icons[progress['status']]} {status[progress['status']]} "
+             f"({progress['id']}, {progress['elapsed']:.0f}s)"]
+    if progress["error"]:
+        lines.append(f"\n{progress['error']}")
+    lines += ["", "| Trader | State | Turn | Tool calls | Elapsed |", "|---|---|---|---|---|"]
+    for name, p in progress["traders"].items():
+        tools = f"{p['tool_calls']} ({', '.join(p['last_tools'])})" if p["last_tools"] else str(p["tool_calls"])
+        lines.append(f"| {name} | {p['state']} | {p['turn']}/{p['max_turns']} | {tools} | {p['elapsed']:.0f}s |")
+    return "\n".join(lines)
+
+
+def leaderboard_df(rows, key: str, label: str) -> pd.DataFrame:
+    """Leaderboard rows (trader or model) as a display table"""
+    return pd.DataFrame([
+        {
+            label: row[key],
+            **({"Traders": row["traders"]} if "traders" in row else {"Model": row["model"]}),
+            "Value": f"${row['value']:,.2f}",
+            "Return": f"{row['return_pct']:+.2%}",
+            "Realized": f"${row['realized_pnl']:+,.2f}",
+            "Unrealized": f"${row['unrealized_pnl']:+,.2f}",
+            "Turnover": f"{row['turnover']:.2f}x",
+            "Win Rate": f"{row['win_rate']:.0%}" if row["win_rate"] is not None else "-",
+            "Trades": row["trade_count"],
+        }
+        for row in rows
+    ], columns=[label, "Traders" if key == "model" else "Model", "Value", "Return", "Realized",
+                "Unrealized", "Turnover", "Win Rate", "Trades"])
+
+
+def leaderboard_tables():
+    """Trader and model leaderboards, best return first"""
+    return (leaderboard_df(trader_leaderboard(), "name", "Trader"),
+            leaderboard_df(model_leaderboard(), "model", "Model"))
+
+
+def log_search_results(text: str, trader: str, log_type: str):
+    """Matching log lines as HTML, plus a status line with the match count and query time"""
+    start = time.perf_counter()
+    rows = search_logs(text, name=None if trader == "All" else trader,
+                       log_type=None if log_type == "All" else log_type)
+    elapsed = (time.perf_counter() - start) * 1000
+    html = "<div style='height: 400px; overflow-y: auto; background: #1a1a1a; padding: 8px; border-radius: 5px; font-family: monospace;'>"
+    for _, name, timestamp, row_type, message in rows:
+        color = LOG_COLORS.get(row_type, "#ffffff")
+        html += f"<p style='color: {color}; margin: 2px 0; font-size: 11px;'>{timestamp} {name} [{row_type}] {message[:200]}</p>"
+    html += "</div>"
+    return html, f"*{len(rows)} lines in {elapsed:.1f} ms*"
+
+
 def create_dashboard():
     """Create the enhanced Gradio dashboard"""
     
@@ -166,21 +388,27 @@ def create_dashboard():
             with gr.Column(scale=1):
                 run_trading_btn = gr.Button("▶️ Run Trading Session", variant="primary", size="lg")
             with gr.Column(scale=1):
-                auto_refresh_toggle = gr.Checkbox(label="Auto-Refresh (30s)", value=False)
+                refresh_status = gr.Markdown("*Live updates connecting...*")
         
-        # Trading session handler
-        def run_trading_session():
-            import asyncio
-            from trading_floor import run_trading_session as execute_trading
-            
+        # Trading session handler: the session runs on the runner's own loop
+        # thread; this handler is an async stream on Gradio's loop that awaits
+        # the session between progress updates, so a watching tab holds no thread
+        async def run_trading_session():
             try:
-                yield "**Status:** 🔄 Trading in progress... (~2 min)"
-                asyncio.run(execute_trading())
-                yield "**Status:** ✅ Complete! Data updated. Refresh to see results."
+                job = runner.start()
+                note = ""
+            except SessionBusy as busy:
+                job, note = busy.job, "Already running - showing the current session.\n\n"
             except Exception as e:
                 yield f"**Status:** ❌ Error: {str(e)}"
+                return
+            
+            finished = asyncio.wrap_future(job.future)
+            while not (await asyncio.wait([finished], timeout=PROGRESS_INTERVAL))[0]:
+                yield note + session_progress_markdown(job.progress())
+            yield session_progress_markdown(job.progress())
         
-        run_trading_btn.click(fn=run_trading_session, outputs=trading_status)
+        run_trading_btn.click(fn=run_trading_session, outputs=trading_status, concurrency_limit=None)
         
         # All traders in tabs
         with gr.Tabs():
@@ -188,18 +416,19 @@ def create_dashboard():
             
             for trader in traders:
                 with gr.Tab(trader.name):
-                    portfolio_html = gr.HTML(trader.get_portfolio_value_html())
-                    chart = gr.Plot(trader.get_portfolio_chart())
-                    logs_html = gr.HTML(trader.get_logs_html())
+                    initial = trader.refresh(force=True)
+                    portfolio_html = gr.HTML(initial["portfolio"])
+                    chart = gr.Plot(initial["chart"])
+                    logs_html = gr.HTML(initial["logs"])
                     
                     with gr.Row():
                         holdings_table = gr.Dataframe(
-                            trader.get_holdings_df(),
+                            initial["holdings"],
                             label="Holdings",
                             interactive=False
                         )
                         transactions_table = gr.Dataframe(
-                            trader.get_transactions_df(),
+                            initial["transactions"],
                             label="Recent Trades",
                             interactive=False
                         )
@@ -207,14 +436,8 @@ def create_dashboard():
                     refresh_btn = gr.Button("🔄 Refresh Data", size="sm")
                     
                     def refresh_trader(t=trader):
-                        t.reload()
-                        return [
-                            t.get_portfolio_value_html(),
-                            t.get_portfolio_chart(),
-                            t.get_logs_html(),
-                            t.get_holdings_df(),
-                            t.get_transactions_df()
-                        ]
+                        rendered = t.refresh(force=True)
+                        return [rendered[component] for component in COMPONENTS]
                     
                     refresh_btn.click(
                        refresh_trader,
@@ -229,49 +452,54 @@ def create_dashboard():
                         "transactions": transactions_table,
                         "trader": trader
                     }
-        
-        # Auto-refresh logic
-        def auto_refresh_all():
-            results = []
-            for trader_name, components in trader_components.items():
-                t = components["trader"]
-                t.reload()
-                results.extend([
-                    t.get_portfolio_value_html(),
-                    t.get_portfolio_chart(),
-                    t.get_logs_html(),
-                    t.get_holdings_df(),
-                    t.get_transactions_df()
-                ])
-            return results
-        
-        # Timer for auto-refresh
-        refresh_timer = gr.Timer(value=30, active=False)
-        
-        def toggle_auto_refresh(enabled):
-            return gr.Timer(active=enabled)
-        
-        auto_refresh_toggle.change(
-            fn=toggle_auto_refresh,
-            inputs=auto_refresh_toggle,
-            outputs=refresh_timer
-        )
+            
+            with gr.Tab("🏆 Leaderboard"):
+                traders_board, models_board = leaderboard_tables()
+                traders_table = gr.Dataframe(traders_board, label="Traders", interactive=False)
+                models_table = gr.Dataframe(models_board, label="Models", interactive=False)
+                leaderboard_btn = gr.Button("🔄 Refresh Leaderboard", size="sm")
+                leaderboard_btn.click(leaderboard_tables, outputs=[traders_table, models_table])
+            
+            with gr.Tab("🔎 Log Search"):
+                with gr.Row():
+                    search_text = gr.Textbox(label="Search", placeholder="NVDA, insufficient funds, sell*", scale=3)
+                    search_trader = gr.Dropdown(["All"] + [t.name for t in traders], value="All", label="Trader")
+                    search_type = gr.Dropdown(["All"] + list(LOG_COLORS), value="All", label="Type")
+                search_status = gr.Markdown()
+                search_results = gr.HTML()
+                search_inputs = [search_text, search_trader, search_type]
+                search_text.submit(log_search_results, inputs=search_inputs, outputs=[search_results, search_status])
+                gr.Button("🔎 Search", size="sm").click(
+                    log_search_results, inputs=search_inputs, outputs=[search_results, search_status]
+                )
         
         all_outputs = []
         for components in trader_components.values():
-            all_outputs.extend([
-                components["portfolio"],
-                components["chart"],
-                components["logs"],
-                components["holdings"],
-                components["transactions"]
-            ])
+            all_outputs.extend(components[component] for component in COMPONENTS)
+        all_outputs.append(refresh_status)
         
-        refresh_timer.tick(
-            fn=auto_refresh_all,
-            outputs=all_outputs,
-            show_progress="hidden"
-        )
+        live_feed = LiveFeed(traders)
+        
+        # Live updates: each connected client is an async stream on the event
+        # loop that waits for the feed and pushes only what changed for it
+        async def stream_updates():
+            seen = {name: {} for name in trader_components}  # this client's displayed inputs
+            async for snapshots, render_ms in live_feed.updates():
+                results, pushed = [], 0
+                for trader_name in trader_components:
+                    snapshot = snapshots.get(trader_name, {})
+                    for component in COMPONENTS:
+                        inputs, value = snapshot.get(component, (None, None))
+                        if component not in snapshot or seen[trader_name].get(component) == inputs:
+                            results.append(gr.update())
+                        else:
+                            seen[trader_name][component] = inputs
+                            results.append(value)
+                            pushed += 1
+                results.append(f"*Live · last update {render_ms:.0f} ms, {pushed} components*")
+                yield results
+        
+        dashboard.load(stream_updates, outputs=all_outputs, show_progress="hidden", concurrency_limit=None)
         
         gr.Markdown("""
 ---
@@ -0,0 +1,130 @@
+"""Background trading sessions for the dashboard
+
+Sessions run on one long-lived event loop in a dedicated thread, so a Gradio
+handler only submits a job and returns; the UI polls the job for per-trader
+progress. Keeping a single loop also keeps the shared LLM connection pools
+(see src/agents/llm_clients.py) warm from one session to the next. Only one
+session runs at a time: a second start() while one is active raises
+SessionBusy instead of trading the same accounts twice.
+"""
+import asyncio
+import concurrent.futures
+import itertools
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.agents.llm_clients import close_clients
+from trading_floor import create_limiter, create_traders, load_config, run_trading_session
+
+MAX_JOBS = 20  # finished jobs kept for the UI
+
+
+class SessionBusy(RuntimeError):
+    """A session is already running"""
+
+    def __init__(self, job: "SessionJob"):
+        super().__init__(f"Session {job.id} is already running")
+        self.job = job
+
+
+class SessionJob:
+    """One trading session: its traders, status and outcome"""
+
+    def __init__(self, job_id: str, config: Dict[str, Any]):
+        self.id = job_id
+        self.config = config
+        self.limiter = create_limiter(config)
+        self.traders = create_traders(config, self.limiter)
+        self.status = "running"
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+        self.future: Optional[concurrent.futures.Future] = None  # the session on the runner's loop; awaitable via asyncio.wrap_future
+
+    @property
+    def running(self) -> bool:
+        return self.status == "running"
+
+    def progress(self) -> Dict[str, Any]:
+        """Job status, elapsed seconds and every trader's progress snapshot"""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "elapsed": (self.finished or time.monotonic()) - self.started,
+            "error": self.error,
+            "traders": {trader.name: trader.progress_snapshot() for trader in self.traders},
+        }
+
+
+class SessionRunner:
+    """Job registry plus the event loop thread that runs the sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ids = itertools.count(1)
+        self.jobs: "OrderedDict[str, SessionJob]" = OrderedDict()
+        self.current: Optional[SessionJob] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="session-runner", daemon=True)
+            self._thread.start()
+        return self._loop
+
+    def start(self, config: Dict[str, Any] = None) -> SessionJob:
+        """Submit a session and return its job at once; raises SessionBusy if one is running"""
+        with self._lock:
+            if self.current is not None and self.current.running:
+                raise SessionBusy(self.current)
+            job = SessionJob(f"session-{next(self._ids)}", config or load_config())
+            self.current = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > MAX_JOBS:
+                self.jobs.popitem(last=False)
+            job.future = asyncio.run_coroutine_threadsafe(self._run(job), self._ensure_loop())
+        return job
+
+    async def _run(self, job: SessionJob):
+        try:
+            job.result = await run_trading_session(job.config, limiter=job.limiter, traders=job.traders)
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "error"
+            traceback.print_exc()
+        finally:
+            job.finished = time.monotonic()
+            job.done.set()
+
+    def get(self, job_id: str) -> Optional[SessionJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Status of every job still in the registry, oldest first"""
+        return [{"id": job.id, "status": job.status, "elapsed": job.progress()["elapsed"]}
+                for job in self.jobs.values()]
+
+    def shutdown(self, timeout: float = 10.0):
+        """Close the loop's LLM connection pools and stop the thread (waits for a running session)"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        if loop is None:
+            return
+        if self.current is not None:
+            self.current.done.wait(timeout)
+        asyncio.run_coroutine_threadsafe(close_clients(), loop).result(timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+
+
+runner = SessionRunner()
@@ -0,0 +1,177 @@
+"""Record/replay store for LLM calls, for deterministic reruns of the trading floor
+
+Set LLM_CASSETTE to choose a mode:
+    off     call the LLM as usual (default)
+    record  call the LLM and store every response
+    replay  serve stored responses only; a request never seen before is an error
+    auto    serve stored responses, calling and recording on a miss
+
+Each response is stored under its slot - which trader asked, in which of its
+sessions, at which turn - hashed with the model and tools. Sessions are
+counted per trader name for the whole process (start_session), however many
+times the floor or the dashboard rebuilds its traders, so the same command
+numbers its sessions the same way when rerun. The prompt itself
+can't be the key: account summaries and tool results carry live prices,
+balances and timestamps, so a rerun a few (simulated) minutes later never
+asks the same thing twice. Instead each entry keeps the prompt's shape (every
+message with its numbers masked) and a lookup only counts as a hit if the
+shape still matches, so a replay that has genuinely diverged - a failed
+trade, a different tool call - is a miss rather than a wrong answer.
+Cassettes live in their own SQLite file (LLM_CASSETTE_PATH) so they survive
+resets of the trading database.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from openai.types.chat import ChatCompletion
+
+from src.core import clock
+
+LLM_CASSETTE = os.getenv("LLM_CASSETTE", "off").lower()
+LLM_CASSETTE_PATH = Path(os.getenv("LLM_CASSETTE_PATH", "data/cassettes.db"))
+MODES = ("off", "record", "replay", "auto")
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+Slot = Tuple[str, int, int]  # trader, session, turn
+
+
+class CassetteMiss(LookupError):
+    """Replay mode was asked for a request that was never recorded"""
+
+
+def _digest(value: Any) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def request_key(request: Dict[str, Any], slot: Slot) -> str:
+    """Hash of where a request was made plus the parts of it that never vary with market data"""
+    return _digest({"slot": list(slot), "model": request["model"], "tools": request.get("tools"),
+                    "tool_choice": request.get("tool_choice")})
+
+
+def _mask(value: Any) -> Any:
+    """Value with every number in it (strings included) replaced by #"""
+    if isinstance(value, str):
+        return _NUMBER.sub("#", value)
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return "#"
+    if isinstance(value, dict):
+        return {k: _mask(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_mask(v) for v in value]
+    return value
+
+
+def prompt_shape(request: Dict[str, Any]) -> str:
+    """Hash of the messages with prices, quantities, balances and timestamps masked out"""
+    return _digest(_mask(request["messages"]))
+
+
+class Cassette:
+    """SQLite-backed response store wrapped around chat.completions.create"""
+
+    def __init__(self, path: Path = LLM_CASSETTE_PATH, mode: str = LLM_CASSETTE):
+        if mode not in MODES:
+            raise ValueError(f"LLM_CASSETTE must be one of {', '.join(MODES)}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.diverged = 0  # misses whose slot was recorded, but for a different prompt
+        self.recorded = 0
+        self._sessions: Dict[str, int] = {}  # trader -> sessions started in this process
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS cassette (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                request TEXT NOT NULL,
+                response TEXT NOT NULL,
+                recorded_at TEXT NOT NULL,
+                prompt TEXT NOT NULL DEFAULT ''
+            )
+            """)
+            # Cassettes recorded before prompt shapes existed (their keys no longer match anyway)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cassette)")}
+            if "prompt" not in columns:
+                conn.execute("ALTER TABLE cassette ADD COLUMN prompt TEXT NOT NULL DEFAULT ''")
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, key: str) -> Optional[Tuple[str, ChatCompletion]]:
+        """Stored prompt shape and response for a request key, if any"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT prompt, response FROM cassette WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], ChatCompletion.model_validate_json(row[1])) if row else None
+
+    def store(self, key: str, request: Dict[str, Any], response: ChatCompletion):
+        """Save (or overwrite) the response for a request key"""
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cassette (key, model, request, response, recorded_at, prompt) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, request["model"], json.dumps(request["messages"], ensure_ascii=False),
+                 response.model_dump_json(), clock.now().strftime("%Y-%m-%d %H:%M:%S"), prompt_shape(request))
+            )
+        self.recorded += 1
+
+    def start_session(self, trader: str) -> int:
+        """Number of the session a trader is starting (1 for its first in this process)"""
+        with self._lock:
+            self._sessions[trader] = self._sessions.get(trader, 0) + 1
+            return self._sessions[trader]
+
+    async def call(self, create: Callable[[Dict[str, Any]], Awaitable[ChatCompletion]],
+                   request: Dict[str, Any], slot: Slot) -> ChatCompletion:
+        """Serve a request from the cassette or via create(request), per the mode"""
+        if self.mode == "off":
+            return await create(request)
+        key = request_key(request, slot)
+        if self.mode in ("replay", "auto"):
+            stored = await asyncio.to_thread(self.lookup, key)
+            if stored is not None and stored[0] == prompt_shape(request):
+                self.hits += 1
+                return stored[1]
+            self.misses += 1
+            if stored is not None:
+                self.diverged += 1
+            if self.mode == "replay":
+                reason = "prompt differs from the recording" if stored else "never recorded"
+                raise CassetteMiss(f"No response for {slot[0]} session {slot[1]} turn {slot[2]} "
+                                   f"(model {request['model']}): {reason}")
+        response = await create(request)
+        await asyncio.to_thread(self.store, key, request, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "diverged": self.diverged,
+                "recorded": self.recorded}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+cassette = Cassette()
@@ -0,0 +1,148 @@
+"""Token-budgeted message history for the trader agent loop
+
+Every turn resends the whole conversation, so stale tool output is paid for
+again on each later turn. ConversationContext keeps the prompt under
+PROMPT_TOKEN_BUDGET: results superseded by a newer call with the same
+arguments (a second get_account, a re-checked price) are elided first, then
+the oldest tool results are replaced with one-line summaries. Messages are
+never dropped, only shortened, so tool_call ids always stay paired.
+"""
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+CHARS_PER_TOKEN = 4  # rough average for English and JSON
+SUMMARY_CHARS = 160  # tool results this short are never worth summarizing
+
+# Tools whose output is fully replaced by a later call with the same arguments
+SUPERSEDABLE_TOOLS = {"get_account", "get_share_price"}
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """Rough token count of one chat message"""
+    chars = len(message.get("content") or "")
+    for call in message.get("tool_calls") or []:
+        chars += len(call["function"]["name"]) + len(call["function"]["arguments"])
+    return math.ceil(chars / CHARS_PER_TOKEN) + 4  # per-message framing
+
+
+def summarize_tool_result(name: str, content: str) -> str:
+    """One-line stand-in for an old tool result"""
+    if name == "get_account":
+        try:
+            data = json.loads(content)
+            holdings = ", ".join(f"{h['symbol']} {h['quantity']}" for h in data.get("holdings", [])) or "none"
+            return (f"[earlier account report] cash ${data['balance']:,.2f}; holdings: {holdings}; "
+                    f"value ${data['total_portfolio_value']:,.2f}; P&L ${data['total_profit_loss']:,.2f}")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+    return f"{content[:SUMMARY_CHARS]}… [trimmed {len(content) - SUMMARY_CHARS} chars]"
+
+
+class ConversationContext:
+    """Agent-loop messages plus per-turn prompt-size metrics"""
+
+    def __init__(self, system: str, user: str, budget: int = PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        self._tokens = [estimate_tokens(m) for m in self.messages]
+        self._raw_tokens = sum(self._tokens)  # what the prompt would be without compaction
+        self._tool_results: List[Dict[str, Any]] = []  # index, name, key, turn, state per tool message
+        self._turn = 0
+        self.turns: List[Dict[str, Any]] = []
+
+    @property
+    def tokens(self) -> int:
+        return sum(self._tokens)
+
+    def _append(self, message: Dict[str, Any]):
+        tokens = estimate_tokens(message)
+        self.messages.append(message)
+        self._tokens.append(tokens)
+        self._raw_tokens += tokens
+
+    def _replace(self, entry: Dict[str, Any], content: str, state: str):
+        message = self.messages[entry["index"]]
+        message["content"] = content
+        self._tokens[entry["index"]] = estimate_tokens(message)
+        entry["state"] = state
+
+    def add_assistant(self, message: Dict[str, Any]):
+        """Record the model's reply (only the fields the next request needs)"""
+        self._turn += 1
+        reply = {"role": "assistant", "content": message.get("content")}
+        if message.get("tool_calls"):
+            reply["tool_calls"] = [
+                {"id": call["id"], "type": "function",
+                 "function": {"name": call["function"]["name"], "arguments": call["function"]["arguments"]}}
+                for call in message["tool_calls"]
+            ]
+        self._append(reply)
+
+    def add_tool_result(self, tool_call_id: str, name: str, arguments: Dict[str, Any], content: str):
+        """Record a tool's output; an earlier identical call's output becomes stale"""
+        key = (name, json.dumps(arguments, sort_keys=True)) if name in SUPERSEDABLE_TOOLS else None
+        if key is not None:
+            for entry in self._tool_results:
+                if entry["key"] == key and entry["state"] != "superseded":
+                    self._replace(entry, f"[superseded by a later {name} call]", "superseded")
+        self._tool_results.append(
+            {"index": len(self.messages), "name": name, "key": key, "turn": self._turn, "state": "full"}
+        )
+        self._append({"role": "tool", "tool_call_id": tool_call_id, "content": content})
+
+    def _compact(self) -> int:
+        """Summarize the oldest tool results (never the latest turn's) until under budget"""
+        summarized = 0
+        for entry in self._tool_results:
+            if self.tokens <= self.budget:
+                break
+            if entry["state"] != "full" or entry["turn"] >= self._turn:
+                continue
+            content = self.messages[entry["index"]]["content"]
+            if len(content) <= SUMMARY_CHARS:
+                continue
+            self._replace(entry, summarize_tool_result(entry["name"], content), "summarized")
+            summarized += 1
+        return summarized
+
+    def prompt(self) -> List[Dict[str, Any]]:
+        """Messages for the next request, compacted to the budget, with the turn's metrics recorded"""
+        summarized = self._compact()
+        self.turns.append({
+            "turn": len(self.turns) + 1,
+            "messages": len(self.messages),
+            "prompt_tokens": self.tokens,
+            "uncompacted_tokens": self._raw_tokens,
+            "summarized": summarized,
+            "superseded": sum(1 for e in self._tool_results if e["state"] == "superseded"),
+            "over_budget": self.tokens > self.budget,
+            "reported_prompt_tokens": None,
+            "tool_seconds": 0.0,
+            "tool_serial_seconds": 0.0,
+        })
+        return self.messages
+
+    def record_usage(self, usage: Optional[Any]):
+        """Attach the provider's own prompt token count to the latest turn"""
+        if usage is not None and self.turns:
+            self.turns[-1]["reported_prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+
+    def record_tools(self, wall: float, serial: float):
+        """Attach the turn's tool latency: wall time, and the sum of individual calls"""
+        if self.turns:
+            self.turns[-1]["tool_seconds"] = wall
+            self.turns[-1]["tool_serial_seconds"] = serial
+
+    def summary(self) -> str:
+        """One log line: prompt size per turn and what was compacted"""
+        sizes = " → ".join(f"{t['prompt_tokens']:,}" for t in self.turns)
+        saved = self._raw_tokens - self.tokens
+        tools = sum(t["tool_seconds"] for t in self.turns)
+        return (f"Prompt tokens per turn: {sizes} (budget {self.budget:,}; "
+                f"{saved:,} tokens elided from the final prompt); tools {tools:.2f}s")
@@ -0,0 +1,124 @@
+"""Per-provider cap on in-flight LLM requests, shared by every trader on the floor
+
+Each provider gets a concurrency limit and an optional requests-per-minute
+pace. Waiters are served strictly first come, first served: a released slot is
+handed straight to the oldest waiter, so a trader that just finished a turn
+queues behind everyone already waiting and hundreds of traders advance in
+round-robin order instead of a few hogging the endpoint.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Union
+
+DEFAULT_CONCURRENCY = 8
+
+
+class _Provider:
+    def __init__(self, concurrency: int, rpm: Optional[float]):
+        self.concurrency = max(1, concurrency)
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_start = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.waits: List[float] = []
+
+
+class ConcurrencyLimiter:
+    """FIFO-fair concurrency (and optional rate) limits keyed by provider name
+
+    limits maps a provider to either a concurrency number or
+    {"concurrency": N, "rpm": M}; providers not listed use `default`.
+    """
+
+    def __init__(self, limits: Dict[str, Union[int, Dict[str, float]]] = None,
+                 default: int = DEFAULT_CONCURRENCY):
+        self.limits = limits or {}
+        self.default = default
+        self._providers: Dict[str, _Provider] = {}
+
+    def _provider(self, name: str) -> _Provider:
+        state = self._providers.get(name)
+        if state is None:
+            limit = self.limits.get(name, self.default)
+            if isinstance(limit, dict):
+                state = _Provider(int(limit.get("concurrency", self.default)), limit.get("rpm"))
+            else:
+                state = _Provider(int(limit), None)
+            self._providers[name] = state
+        return state
+
+    async def acquire(self, provider: str) -> float:
+        """Wait for a slot; returns the seconds spent queued"""
+        state = self._provider(provider)
+        start = time.perf_counter()
+        if state.in_flight < state.concurrency and not state.waiters:
+            state.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter  # release() hands its slot over, in_flight unchanged
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release(provider)  # slot arrived as we were cancelled: pass it on
+                else:
+                    state.waiters.remove(waiter)
+                raise
+        state.max_in_flight = max(state.max_in_flight, state.in_flight)
+
+        if state.interval:
+            # Space request starts to stay under the provider's requests-per-minute
+            now = time.perf_counter()
+            start_at = max(now, state.next_start)
+            state.next_start = start_at + state.interval
+            if start_at > now:
+                try:
+                    await asyncio.sleep(start_at - now)
+                except asyncio.CancelledError:
+                    self.release(provider)
+                    raise
+
+        waited = time.perf_counter() - start
+        state.waits.append(waited)
+        return waited
+
+    def release(self, provider: str):
+        """Give the slot to the oldest waiter, or free it"""
+        state = self._provider(provider)
+        while state.waiters:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        state.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, provider: str) -> AsyncIterator[float]:
+        """Hold one of the provider's slots for the duration of a request"""
+        waited = await self.acquire(provider)
+        try:
+            yield waited
+        finally:
+            self.release(provider)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-provider request counts and queue-wait percentiles (seconds)"""
+        report = {}
+        for name, state in self._providers.items():
+            waits = sorted(state.waits)
+            if not waits:
+                continue
+            pick = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))]
+            report[name] = {
+                "requests": len(waits),
+                "concurrency": state.concurrency,
+                "max_in_flight": state.max_in_flight,
+                "wait_mean": sum(waits) / len(waits),
+                "wait_p50": pick(0.50),
+                "wait_p95": pick(0.95),
+                "wait_max": waits[-1],
+            }
+        return report
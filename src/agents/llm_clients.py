@@ -0,0 +1,103 @@
+"""Process-wide registry of AsyncOpenAI clients, one per endpoint
+
+Traders on the same (base_url, api key) share one client and therefore one
+keep-alive HTTP connection pool, which also survives from session to session,
+so TLS handshakes are paid once per connection instead of once per trader per
+session. Pools are bound to the event loop that opened their sockets, so the
+registry is kept per loop.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))  # per endpoint
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))  # seconds an idle connection is kept
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+
+
+class ConnectionStats:
+    """Counts requests vs new TCP connections and TLS handshakes for one endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+        elif event == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+            }
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_stats: Dict[str, ConnectionStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _endpoint_stats(base_url: Optional[str]) -> ConnectionStats:
+    label = base_url or "https://api.openai.com/v1"
+    with _stats_lock:
+        return _stats.setdefault(label, ConnectionStats())
+
+
+def _http_client(base_url: Optional[str]) -> httpx.AsyncClient:
+    """Connection pool tuned for many concurrent, long-running completions"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        follow_redirects=True,
+        event_hooks={"request": [_endpoint_stats(base_url).on_request]},
+    )
+
+
+def get_client(base_url: Optional[str], api_key: Optional[str]) -> AsyncOpenAI:
+    """Shared client for an endpoint on the running event loop"""
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = (base_url, api_key)
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=_http_client(base_url))
+    return client
+
+
+async def close_clients():
+    """Close the running loop's clients (call before the loop itself closes)"""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+
+
+def connection_stats() -> Dict[str, Dict[str, float]]:
+    """Per-endpoint requests, new connections, TLS handshakes and reuse rate since startup"""
+    with _stats_lock:
+        return {label: stats.snapshot() for label, stats in _stats.items()}
@@ -0,0 +1,219 @@
+"""Local OpenAI-compatible chat-completions stand-in for offline load tests
+
+Serves POST /v1/chat/completions with scripted tool-call sequences, a
+configurable latency distribution and synthetic token counts, so the agent
+loop can be exercised at hundreds of concurrent traders without network or
+API spend. Point traders at it with LLM_BASE_URL=http://127.0.0.1:8765/v1.
+
+Usage:
+    python src/agents/stub_server.py --port 8765 --latency lognormal:-0.7,0.4
+    python src/agents/stub_server.py --script my_script.json --completion-tokens 120
+
+A script is a JSON list of steps, one per assistant turn. Each step is either
+{"content": "..."} or {"tool_calls": [{"name": "...", "arguments": {...}}]}.
+String arguments may use {symbol}, replaced with a per-trader ticker.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SYMBOLS = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "KO", "PG", "JNJ", "PFE", "XOM"]
+
+DEFAULT_SCRIPT = [
+    {"tool_calls": [{"name": "get_account", "arguments": {}}]},
+    {"tool_calls": [{"name": "get_share_price", "arguments": {"symbol": "{symbol}"}}]},
+    {"tool_calls": [{"name": "buy_shares", "arguments": {
+        "symbol": "{symbol}", "quantity": 1, "rationale": "Scripted stub trade"}}]},
+    {"content": "Bought 1 share of {symbol} in line with my strategy."},
+]
+
+
+def parse_latency(spec: str, seed: Optional[int] = None) -> Callable[[], float]:
+    """Build a latency sampler (seconds) from fixed:S, uniform:A,B, lognormal:MU,SIGMA or exp:MEAN"""
+    rng = random.Random(seed)
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda: rng.lognormvariate(values[0], values[1])
+    if kind == "exp":
+        return lambda: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough prompt size: ~4 characters per token"""
+    chars = sum(len(json.dumps(m.get("content") or "")) + len(json.dumps(m.get("tool_calls") or "")) for m in messages)
+    return max(1, math.ceil(chars / 4))
+
+
+class StubBackend:
+    """Picks the scripted reply for a request and keeps load statistics"""
+
+    def __init__(self, script: List[Dict[str, Any]] = None, latency: Callable[[], float] = lambda: 0.0,
+                 completion_tokens: int = 60):
+        self.script = script or DEFAULT_SCRIPT
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _symbol_for(self, messages: List[Dict[str, Any]]) -> str:
+        # Stable per trader: keyed on the system prompt, which names the trader
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        return SYMBOLS[zlib.crc32(system.encode()) % len(SYMBOLS)]
+
+    def reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the chat.completion response for a request"""
+        messages = request.get("messages", [])
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        if turn < len(self.script):
+            step = self.script[turn]
+        else:
+            # Script exhausted: finish with its last plain reply
+            step = next((s for s in reversed(self.script) if "content" in s), {"content": "Done."})
+        symbol = self._symbol_for(messages)
+
+        def fill(value):
+            return value.replace("{symbol}", symbol) if isinstance(value, str) else value
+
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        if "tool_calls" in step:
+            finish_reason = "tool_calls"
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {
+                        "name": call["name"],
+                        "arguments": json.dumps({k: fill(v) for k, v in call.get("arguments", {}).items()}),
+                    },
+                }
+                for call in step["tool_calls"]
+            ]
+        else:
+            message["content"] = fill(step.get("content", ""))
+
+        prompt_tokens = estimate_tokens(messages)
+        completion_tokens = step.get("completion_tokens", self.completion_tokens)
+        return {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Reply after sleeping for a sampled latency"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(max(0.0, self.latency()))
+            return self.reply(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    backend: StubBackend = None
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(200, self.backend.handle(request))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.backend.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate a load test
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # hundreds of traders connect at once
+
+
+def make_stub_server(host: str, port: int, backend: StubBackend) -> StubServer:
+    """Bind a server whose handlers share one backend"""
+    handler = type("BoundStubHandler", (StubHandler,), {"backend": backend})
+    return StubServer((host, port), handler)
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0,
+                      backend: StubBackend = None) -> Tuple[StubServer, str]:
+    """Serve in a background thread; returns the server and its /v1 base URL"""
+    server = make_stub_server(host, port, backend or StubBackend())
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with the per-turn reply script")
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:A,B | lognormal:MU,SIGMA | exp:MEAN")
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=None, help="seed for the latency sampler")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    backend = StubBackend(script, parse_latency(args.latency, args.seed), args.completion_tokens)
+    server = make_stub_server(args.host, args.port, backend)
+    print(f"LLM stub listening on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 """Prompt templates for trader and researcher agents"""
-from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from src.core import clock
 
 
 def researcher_instructions() -> str:
@@ -17,7 +21,7 @@ Capabilities:
 - Market trend identification
 - Risk assessment
 
-Current datetime: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Current datetime: {clock.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 When researching:
 1. Search for recent news and data
@@ -46,7 +50,8 @@ Available tools:
 - get_share_price: Check current stock prices
 - buy_shares: Purchase stocks (requires: symbol, quantity, rationale)
 - sell_shares: Sell stocks (requires: symbol, quantity, rationale)
-- get_account: View your current balance, holdings, and P&L
+- get_account: View your current balance, holdings, P&L and recent trades
+- get_transactions: Page through your full trade history
 - change_strategy: Update your investment approach
 
 Trading workflow:
@@ -62,7 +67,7 @@ Important:
 - Follow your investment strategy
 - Be decisive but thoughtful
 
-Current datetime: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Current datetime: {clock.now().strftime("%Y-%m-%d %H:%M:%S")}
 """
 
 
@@ -76,7 +81,7 @@ Your strategy:
 Current account status:
 {account}
 
-Current datetime: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Current datetime: {clock.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 Instructions:
 1. Use the researcher to find opportunities matching your strategy
@@ -98,7 +103,7 @@ Your strategy:
 Current account status:
 {account}
 
-Current datetime: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Current datetime: {clock.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 Instructions:
 1. Review your current holdings
@@ -1,8 +1,11 @@
 """Simplified trader agent using OpenAI function calling"""
+import asyncio
 import os
 import json
 import sys
-from typing import List, Dict, Any
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Any, Tuple
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
@@ -11,10 +14,39 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from src.core.accounts import Account
 from src.core.market import get_share_price
 from src.core.database import write_log
+from src.core.tracing import current_span, span
 from src.agents.templates import trader_instructions, trade_message, rebalance_message
+from src.agents.cassette import cassette
+from src.agents.context import ConversationContext
+from src.agents.limiter import ConcurrencyLimiter
+from src.agents.llm_clients import get_client
 
 load_dotenv()
 
+# Override every provider with one OpenAI-compatible endpoint, e.g. the local
+# stub from src/agents/stub_server.py for offline load tests
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "stub")
+
+# OpenAI-compatible endpoints a trader can be configured with
+PROVIDERS = {
+    "openrouter": {"base_url": "https://openrouter.ai/api/v1", "api_key_env": "OPENROUTER_API_KEY"},
+    "gemini": {"base_url": "https://generativelanguage.googleapis.com/v1beta/openai/", "api_key_env": "GOOGLE_API_KEY"},
+    "openai": {"base_url": None, "api_key_env": "OPENAI_API_KEY"},
+}
+
+
+def provider_for(model_name: str) -> str:
+    """Default provider for a model: Gemini direct, everything else via OpenRouter"""
+    if "gemini" in model_name.lower() or "google" in model_name.lower():
+        return "gemini"
+    return "openrouter"
+
+
+# Tools with no effect on the account, safe to run concurrently within a turn
+# (get_account is not one: it records a portfolio snapshot)
+READ_ONLY_TOOLS = {"get_share_price", "get_transactions"}
+
 # Trader strategies
 STRATEGIES = {
     "Warren": """Value Investing Strategy:
@@ -50,37 +82,41 @@ STRATEGIES = {
 class SimpleTrader:
     """Simplified trader using OpenAI function calling"""
     
-    def __init__(self, name: str, model_name: str):
+    def __init__(self, name: str, model_name: str, provider: str = None, strategy: str = None,
+                 limiter: ConcurrencyLimiter = None):
         self.name = name
         self.model_name = model_name
-        self.account = Account.get(name)
+        self.provider = provider or provider_for(model_name)
+        self.strategy = strategy if strategy is not None else STRATEGIES.get(name, "")
+        self.limiter = limiter  # Shared per-provider cap on in-flight LLM requests
+        self.account = None  # Loaded asynchronously at the start of each run
+        self.context = None  # Latest run's ConversationContext (messages and per-turn prompt metrics)
         self.do_trade = True  # Alternate between trading and rebalancing
+        self.session = 0  # This run's number in cassette.start_session; with the turn, names each LLM call's slot
+        self.progress = {"state": "idle", "turn": 0, "max_turns": 0, "tool_calls": 0, "last_tools": [],
+                         "started": None, "finished": None, "error": None}
         
-        # Initialize with strategy if new account
-        if not self.account.strategy:
-            self.account.strategy = STRATEGIES.get(name, "")
-            self.account.save()
+        self._client = None
         
-        # Setup OpenAI client based on model
-        if "gemini" in model_name.lower() or "google" in model_name.lower():
-            # Use direct Gemini API
-            self.client = AsyncOpenAI(
-                base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-                api_key=os.getenv("GOOGLE_API_KEY")
-            )
-            self.model_name = "gemini-2.0-flash-exp"
-        elif "deepseek" in model_name.lower() or "/" in model_name:
-            # Use OpenRouter for all other models
-            self.client = AsyncOpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.getenv("OPENROUTER_API_KEY")
-            )
+        # Endpoint based on provider; the client itself is shared (see llm_clients.py)
+        if LLM_BASE_URL:
+            # Explicit endpoint (e.g. the local stub server) for every trader
+            self.base_url, self.api_key = LLM_BASE_URL, LLM_API_KEY
         else:
-            # Fallback to OpenRouter
-            self.client = AsyncOpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.getenv("OPENROUTER_API_KEY")
-            )
+            config = PROVIDERS[self.provider]
+            self.base_url, self.api_key = config["base_url"], os.getenv(config["api_key_env"])
+        if self.provider == "gemini" or self.provider == "openai":
+            # Direct APIs take bare model names ("gemini-2.0-flash-exp", "gpt-4o-mini")
+            self.model_name = model_name.split("/", 1)[-1]
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """This trader's endpoint client, shared with every trader on the same endpoint"""
+        return self._client or get_client(self.base_url, self.api_key)
+    
+    @client.setter
+    def client(self, client):
+        self._client = client  # Explicit override, e.g. a fake client in benchmarks
     
     def get_tools(self) -> List[Dict[str, Any]]:
         """Define available tools for the trader"""
@@ -138,21 +174,48 @@ class SimpleTrader:
                 "type": "function",
                 "function": {
                     "name": "get_account",
-                    "description": "Get current account status (balance, holdings, P&L)",
+                    "description": "Get current account status (balance, holdings, P&L, recent trades)",
                     "parameters": {"type": "object", "properties": {}}
                 }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_transactions",
+                    "description": "Page through full trade history, newest first",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "offset": {"type": "integer", "description": "Trades to skip (default 0)"},
+                            "limit": {"type": "integer", "description": "Trades per page, max 100 (default 20)"}
+                        }
+                    }
+                }
             }
         ]
     
+    async def load_account(self) -> Account:
+        """Load (or create) the account without blocking other traders"""
+        self.account = await Account.aget(self.name)
+        
+        # Initialize with strategy if new account
+        if not self.account.strategy:
+            await self.account.achange_strategy(self.strategy)
+        # The leaderboard groups accounts by the model trading them
+        if self.account.model != self.model_name:
+            await self.account.aset_model(self.model_name)
+        return self.account
+    
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """Execute a tool and return result"""
         try:
             if tool_name == "get_share_price":
-                price = get_share_price(arguments["symbol"])
+                # May go upstream on a cache miss; keep it off the event loop
+                price = await asyncio.to_thread(get_share_price, arguments["symbol"])
                 return f"${price:.2f}"
             
             elif tool_name == "buy_shares":
-                result = self.account.buy_shares(
+                result = await self.account.abuy_shares(
                     arguments["symbol"],
                     arguments["quantity"],
                     arguments["rationale"]
@@ -160,7 +223,7 @@ class SimpleTrader:
                 return result
             
             elif tool_name == "sell_shares":
-                result = self.account.sell_shares(
+                result = await self.account.asell_shares(
                     arguments["symbol"],
                     arguments["quantity"],
                     arguments["rationale"]
@@ -168,7 +231,13 @@ class SimpleTrader:
                 return result
             
             elif tool_name == "get_account":
-                return self.account.report()
+                return await self.account.asummary()
+            
+            elif tool_name == "get_transactions":
+                return await self.account.atransactions_page(
+                    arguments.get("offset", 0),
+                    arguments.get("limit", 20)
+                )
             
             else:
                 return f"Unknown tool: {tool_name}"
@@ -176,59 +245,135 @@ class SimpleTrader:
         except Exception as e:
             return f"Error: {str(e)}"
     
+    async def run_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> Tuple[List[str], List[float]]:
+        """Execute one turn's tool calls, returning results and latencies in call order
+        
+        Consecutive read-only calls run concurrently; a mutating call waits for
+        everything issued before it and runs alone, so trades apply in order and
+        a later get_account sees them.
+        """
+        results: List[str] = [""] * len(calls)
+        durations = [0.0] * len(calls)
+        
+        async def timed(i: int):
+            start = time.perf_counter()
+            async with span("tool", calls[i][0]) as tool:
+                results[i] = await self.execute_tool(*calls[i])
+                if results[i].startswith("Error:"):
+                    tool.set(error=results[i])
+            durations[i] = time.perf_counter() - start
+        
+        batch = []
+        for i, (func_name, _) in enumerate(calls):
+            if func_name in READ_ONLY_TOOLS:
+                batch.append(timed(i))
+                continue
+            if batch:
+                await asyncio.gather(*batch)
+                batch = []
+            await timed(i)
+        if batch:
+            await asyncio.gather(*batch)
+        return results, durations
+    
+    async def complete(self, messages: List[Dict[str, Any]], turn: int = 0):
+        """One LLM call, served from the cassette when LLM_CASSETTE replays it"""
+        request = {
+            "model": self.model_name,
+            "messages": messages,
+            "tools": self.get_tools(),
+            "tool_choice": "auto"
+        }
+        async with span("llm", "chat.completions", provider=self.provider) as call:
+            response = await cassette.call(self._create, request, (self.name.lower(), self.session, turn))
+            if response.usage is not None:
+                call.set(prompt_tokens=response.usage.prompt_tokens,
+                         completion_tokens=response.usage.completion_tokens)
+            return response
+    
+    async def _create(self, request: Dict[str, Any]):
+        """Call the provider, waiting for a slot when the floor is limited"""
+        queued = time.perf_counter()
+        async with self.limiter.slot(self.provider) if self.limiter else nullcontext():
+            call = current_span()
+            if call is not None:
+                call.set(queue_ms=round((time.perf_counter() - queued) * 1000, 2))  # absent when the cassette served it
+            return await self.client.chat.completions.create(**request)
+    
+    def progress_snapshot(self) -> Dict[str, Any]:
+        """Where the current run is: state, turn, tool calls so far and elapsed seconds"""
+        snapshot = dict(self.progress)
+        started, finished = snapshot.pop("started"), snapshot.pop("finished")
+        snapshot["elapsed"] = ((finished or time.monotonic()) - started) if started else 0.0
+        return snapshot
+    
     async def run(self, max_turns: int = 10):
         """Run the trader agent"""
-        try:
-            write_log(self.name, "agent", f"Starting {'trading' if self.do_trade else 'rebalancing'} session")
-            
-            # Get initial message
-            message = (
-                trade_message(self.name, self.account.strategy, self.account.report())
-                if self.do_trade
-                else rebalance_message(self.name, self.account.strategy, self.account.report())
-            )
-            
-            messages = [
-                {"role": "system", "content": trader_instructions(self.name)},
-                {"role": "user", "content": message}
-            ]
-            
-            # Agent loop
-            for turn in range(max_turns):
-                response = await self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,
-                    tools=self.get_tools(),
-                    tool_choice="auto"
+        self.progress.update(state="starting", turn=0, max_turns=max_turns, tool_calls=0, last_tools=[],
+                             started=time.monotonic(), finished=None, error=None)
+        self.session = cassette.start_session(self.name.lower())
+        async with span("trader", "trade" if self.do_trade else "rebalance",
+                        trader=self.name, model=self.model_name) as run:
+            try:
+                write_log(self.name, "agent", f"Starting {'trading' if self.do_trade else 'rebalancing'} session")
+                await self.load_account()
+                
+                # Get initial message
+                report = await self.account.asummary()
+                message = (
+                    trade_message(self.name, self.account.strategy, report)
+                    if self.do_trade
+                    else rebalance_message(self.name, self.account.strategy, report)
                 )
                 
-                assistant_message = response.choices[0].message
-                messages.append(assistant_message.model_dump())
+                # Message history, compacted to PROMPT_TOKEN_BUDGET before each request
+                context = ConversationContext(trader_instructions(self.name), message)
+                self.context = context
                 
-                # Check if done
-                if not assistant_message.tool_calls:
-                    write_log(self.name, "response", assistant_message.content or "No response")
-                    print(f"{self.name}: {assistant_message.content}")
-                    break
+                # Agent loop
+                for turn in range(max_turns):
+                    async with span("turn", "turn", turn=turn + 1):
+                        self.progress.update(state="thinking", turn=turn + 1)
+                        response = await self.complete(context.prompt(), turn + 1)
+                        context.record_usage(response.usage)
+                        
+                        assistant_message = response.choices[0].message
+                        context.add_assistant(assistant_message.model_dump())
+                        
+                        # Check if done
+                        if not assistant_message.tool_calls:
+                            write_log(self.name, "response", assistant_message.content or "No response")
+                            print(f"{self.name}: {assistant_message.content}")
+                            break
+                        
+                        # Execute tools (results stay in the order the model issued them)
+                        calls = []
+                        for tool_call in assistant_message.tool_calls:
+                            func_name = tool_call.function.name
+                            args = json.loads(tool_call.function.arguments)
+                            write_log(self.name, "function", f"{func_name}({args})")
+                            calls.append((func_name, args))
+                        
+                        self.progress["state"] = "tools"
+                        self.progress["tool_calls"] += len(calls)
+                        self.progress["last_tools"] = [name for name, _ in calls]
+                        start = time.perf_counter()
+                        results, durations = await self.run_tools(calls)
+                        context.record_tools(time.perf_counter() - start, sum(durations))
+                        
+                        for tool_call, (func_name, args), result in zip(assistant_message.tool_calls, calls, results):
+                            context.add_tool_result(tool_call.id, func_name, args, result)
                 
-                # Execute tools
-                for tool_call in assistant_message.tool_calls:
-                    func_name = tool_call.function.name
-                    args = json.loads(tool_call.function.arguments)
-                    
-                    write_log(self.name, "function", f"{func_name}({args})")
-                    result = await self.execute_tool(func_name, args)
-                    
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": result
-                    })
-            
-            # Toggle mode for next run
-            self.do_trade = not self.do_trade
-            write_log(self.name, "agent", "Session complete")
-            
-        except Exception as e:
-            write_log(self.name, "error", str(e))
-            print(f"{self.name} error: {e}")
+                # Toggle mode for next run
+                self.do_trade = not self.do_trade
+                write_log(self.name, "agent", context.summary())
+                write_log(self.name, "agent", "Session complete")
+                self.progress["state"] = "done"
+                
+            except Exception as e:
+                self.progress.update(state="error", error=str(e))
+                run.set(error=str(e))
+                write_log(self.name, "error", str(e))
+                print(f"{self.name} error: {e}")
+            finally:
+                self.progress["finished"] = time.monotonic()
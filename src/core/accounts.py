@@ -1,19 +1,33 @@
 """Trading account management with buy/sell operations"""
-from pydantic import BaseModel
-from typing import Dict, List
-from datetime import datetime
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import json
 import sys
 import os
 
-# Add parent to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from core.market import get_share_price
-from core.database import write_account, read_account, write_log
+# Add project root to path for imports (same package path as the traders and
+# dashboard, so the process shares one copy of the database module)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from src.core.market import get_share_price, get_share_prices
+from src.core.database import (
+    write_account, read_account, write_log, record_trade,
+    write_portfolio_snapshot, write_strategy, write_model, read_transactions_page, TRANSACTION_TAIL
+)
+from src.core import async_database, clock
+from src.core.ledger import PositionLedger
 
 INITIAL_BALANCE = float(os.getenv("INITIAL_BALANCE", "10000"))
 SPREAD = 0.002  # 0.2% spread on trades
 
+# Bounds on summary() so its size doesn't grow with account history
+SUMMARY_RECENT_TRADES = int(os.getenv("SUMMARY_RECENT_TRADES", "5"))
+SUMMARY_MAX_HOLDINGS = int(os.getenv("SUMMARY_MAX_HOLDINGS", "25"))
+SUMMARY_RATIONALE_CHARS = 80
+
+# Only the recent part of these is loaded; save() leaves the stored histories alone
+HISTORY_FIELDS = {"transactions", "portfolio_value_time_series"}
+
 
 class Transaction(BaseModel):
     """Single transaction record"""
@@ -22,6 +36,7 @@ class Transaction(BaseModel):
     price: float
     timestamp: str
     rationale: str
+    realized_pnl: float = 0.0  # P&L a sale realized against the average cost
     
     def total(self) -> float:
         return abs(self.quantity) * self.price
@@ -31,34 +46,91 @@ class Transaction(BaseModel):
         return f"{action} {abs(self.quantity)} shares of {self.symbol} at ${self.price:.2f}"
 
 
+class TradeStats(BaseModel):
+    """Running aggregates over an account's trades (kept on the accounts row)"""
+    trade_count: int = 0
+    buy_count: int = 0
+    sell_count: int = 0
+    bought_value: float = 0.0
+    sold_value: float = 0.0
+    first_trade_at: Optional[str] = None
+    last_trade_at: Optional[str] = None
+    winning_sells: int = 0
+    
+    def add(self, transaction: Transaction):
+        """Fold one trade in (mirrors SQL_ADD_TRADE_STATS)"""
+        self.trade_count += 1
+        if transaction.quantity > 0:
+            self.buy_count += 1
+            self.bought_value += transaction.total()
+        else:
+            self.sell_count += 1
+            self.sold_value += transaction.total()
+            self.winning_sells += transaction.realized_pnl > 0
+        self.first_trade_at = self.first_trade_at or transaction.timestamp
+        self.last_trade_at = transaction.timestamp
+
+
 class Account(BaseModel):
-    """Trading account for a single trader"""
+    """Trading account for a single trader
+    
+    Every persisting method has an awaitable twin (aget, asave, abuy_shares, ...)
+    that runs on a database worker thread for callers on the event loop.
+    """
     name: str
     balance: float
     strategy: str
     holdings: Dict[str, int]
-    transactions: List[Transaction]
-    portfolio_value_time_series: List[tuple]
+    model: str = ""  # model trading the account, for the leaderboard
+    transactions: List[Transaction]  # recent trades only; get_transactions pages the full history
+    portfolio_value_time_series: List[tuple]  # recent points only; full history in src/core/timeseries.py
+    trade_stats: TradeStats = Field(default_factory=TradeStats)
+    cost_basis: Dict[str, float] = Field(default_factory=dict)  # average cost per held symbol
+    realized_pnl: float = 0.0
+    _ledger: PositionLedger = PrivateAttr(default_factory=PositionLedger)
+    
+    def model_post_init(self, __context: Any):
+        self._ledger = PositionLedger(
+            {symbol: (quantity, self.cost_basis.get(symbol, 0.0)) for symbol, quantity in self.holdings.items()},
+            self.realized_pnl
+        )
+    
+    @staticmethod
+    def _new_fields(name: str) -> dict:
+        return {
+            "name": name.lower(),
+            "balance": INITIAL_BALANCE,
+            "strategy": "",
+            "holdings": {},
+            "transactions": [],
+            "portfolio_value_time_series": []
+        }
     
     @classmethod
     def get(cls, name: str):
         """Load or create account"""
         fields = read_account(name.lower())
         if not fields:
-            fields = {
-                "name": name.lower(),
-                "balance": INITIAL_BALANCE,
-                "strategy": "",
-                "holdings": {},
-                "transactions": [],
-                "portfolio_value_time_series": []
-            }
+            fields = cls._new_fields(name)
             write_account(name.lower(), fields)
         return cls(**fields)
     
+    @classmethod
+    async def aget(cls, name: str):
+        """Load or create account without blocking the event loop"""
+        fields = await async_database.aread_account(name.lower())
+        if not fields:
+            fields = cls._new_fields(name)
+            await async_database.awrite_account(name.lower(), fields)
+        return cls(**fields)
+    
     def save(self):
-        """Persist account to database"""
-        write_account(self.name.lower(), self.model_dump())
+        """Persist the whole account to database (trades and reports append incrementally)"""
+        write_account(self.name.lower(), self.model_dump(exclude=HISTORY_FIELDS))
+    
+    async def asave(self):
+        """Persist the whole account without blocking the event loop"""
+        await async_database.awrite_account(self.name.lower(), self.model_dump(exclude=HISTORY_FIELDS))
     
     def reset(self, strategy: str):
         """Reset account with new strategy"""
@@ -67,11 +139,16 @@ class Account(BaseModel):
         self.holdings = {}
         self.transactions = []
         self.portfolio_value_time_series = []
-        self.save()
+        self.trade_stats = TradeStats()
+        self.cost_basis = {}
+        self.realized_pnl = 0.0
+        self._ledger = PositionLedger()
+        write_account(self.name.lower(), self.model_dump())  # clears the stored histories too
     
-    def buy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
-        """Buy shares with spread"""
-        price = get_share_price(symbol)
+    def _apply_buy(self, symbol: str, quantity: int, rationale: str, price: float) -> Transaction:
+        """Validate a buy at the quoted price and apply it in memory"""
+        if quantity <= 0:
+            raise ValueError(f"Cannot buy {quantity} shares of {symbol}. Quantity must be positive")
         if price == 0:
             raise ValueError(f"Invalid symbol: {symbol}")
         
@@ -81,63 +158,132 @@ class Account(BaseModel):
         if total_cost > self.balance:
             raise ValueError(f"Insufficient funds. Need ${total_cost:.2f}, have ${self.balance:.2f}")
         
-        # Update holdings
-        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        # Update holdings and cost basis
+        self._ledger.buy(symbol, quantity, buy_price)
+        self.holdings[symbol] = self._ledger.quantities[symbol]
+        self.cost_basis[symbol] = self._ledger.avg_costs[symbol]
         
         # Record transaction
         transaction = Transaction(
             symbol=symbol,
             quantity=quantity,
             price=buy_price,
-            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            timestamp=clock.now().strftime("%Y-%m-%d %H:%M:%S"),
             rationale=rationale
         )
-        self.transactions.append(transaction)
+        self._record(transaction)
         
         # Update balance
         self.balance -= total_cost
-        self.save()
-        write_log(self.name, "account", f"Bought {quantity} {symbol} @ ${buy_price:.2f}")
-        
-        return f"✅ Purchased {quantity} shares of {symbol} at ${buy_price:.2f}. New balance: ${self.balance:.2f}"
+        return transaction
     
-    def sell_shares(self, symbol: str, quantity: int, rationale: str) -> str:
-        """Sell shares with spread"""
+    def _check_sell(self, symbol: str, quantity: int):
+        if quantity <= 0:
+            raise ValueError(f"Cannot sell {quantity} shares of {symbol}. Quantity must be positive")
         if self.holdings.get(symbol, 0) < quantity:
             raise ValueError(f"Cannot sell {quantity} shares of {symbol}. Only have {self.holdings.get(symbol, 0)}")
-        
-        price = get_share_price(symbol)
+    
+    def _apply_sell(self, symbol: str, quantity: int, rationale: str, price: float) -> Transaction:
+        """Validate a sell at the quoted price and apply it in memory"""
+        self._check_sell(symbol, quantity)
         sell_price = price * (1 - SPREAD)
         total_proceeds = sell_price * quantity
         
-        # Update holdings
-        self.holdings[symbol] -= quantity
-        if self.holdings[symbol] == 0:
+        # Update holdings, realizing P&L against the average cost
+        realized = self._ledger.sell(symbol, quantity, sell_price)
+        self.realized_pnl = self._ledger.realized_pnl
+        if symbol in self._ledger.quantities:
+            self.holdings[symbol] = self._ledger.quantities[symbol]
+        else:
             del self.holdings[symbol]
+            self.cost_basis.pop(symbol, None)
         
         # Record transaction
         transaction = Transaction(
             symbol=symbol,
             quantity=-quantity,  # Negative for sell
             price=sell_price,
-            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            rationale=rationale
+            timestamp=clock.now().strftime("%Y-%m-%d %H:%M:%S"),
+            rationale=rationale,
+            realized_pnl=realized
         )
-        self.transactions.append(transaction)
+        self._record(transaction)
         
         # Update balance
         self.balance += total_proceeds
-        self.save()
-        write_log(self.name, "account", f"Sold {quantity} {symbol} @ ${sell_price:.2f}")
-        
-        return f"✅ Sold {quantity} shares of {symbol} at ${sell_price:.2f}. New balance: ${self.balance:.2f}"
+        return transaction
+    
+    def _record(self, transaction: Transaction):
+        """Add a trade to the running stats and the in-memory tail of recent trades"""
+        self.trade_stats.add(transaction)
+        self.transactions.append(transaction)
+        del self.transactions[:-TRANSACTION_TAIL]
+    
+    def _trade_row(self, transaction: Transaction) -> tuple:
+        """record_trade arguments after a trade: balance, row, the symbol's average cost, realized P&L"""
+        return (self.balance, transaction.model_dump(),
+                self.cost_basis.get(transaction.symbol, 0.0), self.realized_pnl)
+    
+    def _trade_result(self, transaction: Transaction) -> str:
+        """Log a persisted trade and build the tool response"""
+        quantity = abs(transaction.quantity)
+        if transaction.quantity > 0:
+            write_log(self.name, "account", f"Bought {quantity} {transaction.symbol} @ ${transaction.price:.2f}")
+            return f"✅ Purchased {quantity} shares of {transaction.symbol} at ${transaction.price:.2f}. New balance: ${self.balance:.2f}"
+        write_log(self.name, "account", f"Sold {quantity} {transaction.symbol} @ ${transaction.price:.2f}")
+        return f"✅ Sold {quantity} shares of {transaction.symbol} at ${transaction.price:.2f}. New balance: ${self.balance:.2f}"
+    
+    def buy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
+        """Buy shares with spread"""
+        transaction = self._apply_buy(symbol, quantity, rationale, get_share_price(symbol))
+        record_trade(self.name, *self._trade_row(transaction))
+        return self._trade_result(transaction)
+    
+    async def abuy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
+        """Buy shares with spread, quoting and persisting without blocking the event loop"""
+        # A quote may go upstream on a cache miss
+        price = await asyncio.to_thread(get_share_price, symbol)
+        transaction = self._apply_buy(symbol, quantity, rationale, price)
+        await async_database.arecord_trade(self.name, *self._trade_row(transaction))
+        return self._trade_result(transaction)
+    
+    def sell_shares(self, symbol: str, quantity: int, rationale: str) -> str:
+        """Sell shares with spread"""
+        self._check_sell(symbol, quantity)
+        transaction = self._apply_sell(symbol, quantity, rationale, get_share_price(symbol))
+        record_trade(self.name, *self._trade_row(transaction))
+        return self._trade_result(transaction)
+    
+    async def asell_shares(self, symbol: str, quantity: int, rationale: str) -> str:
+        """Sell shares with spread, quoting and persisting without blocking the event loop"""
+        self._check_sell(symbol, quantity)
+        price = await asyncio.to_thread(get_share_price, symbol)
+        # Re-checked in _apply_sell: another call may have sold while the quote was fetched
+        transaction = self._apply_sell(symbol, quantity, rationale, price)
+        await async_database.arecord_trade(self.name, *self._trade_row(transaction))
+        return self._trade_result(transaction)
     
     def calculate_portfolio_value(self) -> float:
-        """Calculate total portfolio value (cash + holdings)"""
-        total = self.balance
-        for symbol, quantity in self.holdings.items():
-            total += get_share_price(symbol) * quantity
-        return total
+        """Calculate total portfolio value (cash + holdings), re-valuing only positions whose price moved"""
+        return self._value(get_share_prices(list(self.holdings)))
+    
+    async def acalculate_portfolio_value(self) -> float:
+        """Calculate total portfolio value, fetching prices off the event loop"""
+        return self._value(await asyncio.to_thread(get_share_prices, list(self.holdings)))
+    
+    def _value(self, prices: Dict[str, float]) -> float:
+        self._ledger.mark(prices)
+        return self.balance + self._ledger.market_value
+    
+    def positions(self) -> List[Dict[str, Any]]:
+        """Open positions with quantity, average cost, mark, market value and unrealized P&L"""
+        self.calculate_portfolio_value()
+        return self._ledger.positions()
+    
+    def unrealized_pnl(self) -> float:
+        """Mark-to-market gain of the open positions over their cost"""
+        self.calculate_portfolio_value()
+        return self._ledger.unrealized_pnl()
     
     def calculate_profit_loss(self, portfolio_value: float = None) -> float:
         """Calculate P&L from initial investment"""
@@ -150,27 +296,113 @@ class Account(BaseModel):
         return self.holdings
     
     def list_transactions(self) -> List[dict]:
-        """Get transaction history"""
+        """Get the recent transactions held in memory (oldest first)"""
         return [t.model_dump() for t in self.transactions]
     
-    def report(self) -> str:
-        """Generate account report as JSON"""
-        portfolio_value = self.calculate_portfolio_value()
-        pnl = self.calculate_profit_loss(portfolio_value)
-        
-        # Record portfolio value
-        self.portfolio_value_time_series.append(
-            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value)
-        )
-        self.save()
-        
+    @staticmethod
+    def _page_bounds(offset: int, limit: int) -> Tuple[int, int]:
+        return max(offset, 0), min(max(limit, 1), 100)
+    
+    def _page(self, offset: int, page: List[dict]) -> str:
+        """One page of get_transactions; the total comes from the running trade count"""
+        total = self.trade_stats.trade_count
+        return json.dumps({
+            "total": total,
+            "offset": offset,
+            "next_offset": offset + len(page) if offset + len(page) < total else None,
+            "transactions": page,
+        })
+    
+    def transactions_page(self, offset: int = 0, limit: int = 20) -> str:
+        """Trade history as JSON, newest first, one page at a time (read from the database)"""
+        offset, limit = self._page_bounds(offset, limit)
+        return self._page(offset, read_transactions_page(self.name, offset, limit))
+    
+    async def atransactions_page(self, offset: int = 0, limit: int = 20) -> str:
+        """One page of trade history without blocking the event loop"""
+        offset, limit = self._page_bounds(offset, limit)
+        return self._page(offset, await async_database.aread_transactions_page(self.name, offset, limit))
+    
+    def _mark(self, portfolio_value: float) -> Tuple[str, float]:
+        """Record a portfolio valuation as a point in memory"""
+        snapshot = (clock.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value)
+        self.portfolio_value_time_series.append(snapshot)
+        return snapshot
+    
+    def _full_report(self, portfolio_value: float) -> str:
         data = self.model_dump()
+        data["positions"] = self._ledger.positions()
         data["total_portfolio_value"] = portfolio_value
-        data["total_profit_loss"] = pnl
-        write_log(self.name, "account", "Retrieved account report")
-        
+        data["total_profit_loss"] = self.calculate_profit_loss(portfolio_value)
+        data["unrealized_profit_loss"] = self._ledger.unrealized_pnl()
         return json.dumps(data, indent=2)
     
+    def _summary(self, portfolio_value: float, recent_trades: int = SUMMARY_RECENT_TRADES) -> str:
+        """Bounded view: its size depends on the limits, not on how long the account has traded"""
+        positions = sorted(
+            ({"symbol": p["symbol"], "quantity": p["quantity"], "avg_cost": round(p["avg_cost"], 2),
+              "price": round(p["price"], 2), "value": round(p["market_value"], 2),
+              "unrealized_pnl": round(p["unrealized_pnl"], 2)}
+             for p in self._ledger.positions()),
+            key=lambda p: -p["value"]
+        )
+        for position in positions:
+            position["weight"] = round(position["value"] / portfolio_value, 4) if portfolio_value else 0.0
+        shown, rest = positions[:SUMMARY_MAX_HOLDINGS], positions[SUMMARY_MAX_HOLDINGS:]
+        pnl = self.calculate_profit_loss(portfolio_value)
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "balance": round(self.balance, 2),
+            "total_portfolio_value": round(portfolio_value, 2),
+            "total_profit_loss": round(pnl, 2),
+            "return_pct": round(pnl / INITIAL_BALANCE * 100, 2),
+            "realized_pnl": round(self.realized_pnl, 2),
+            "unrealized_pnl": round(self._ledger.unrealized_pnl(), 2),
+            "holdings": shown,
+        }
+        if rest:
+            data["other_holdings"] = {"count": len(rest), "value": round(sum(p["value"] for p in rest), 2)}
+        data["recent_trades"] = [
+            {"symbol": t.symbol, "quantity": t.quantity, "price": round(t.price, 2), "timestamp": t.timestamp,
+             "rationale": t.rationale[:SUMMARY_RATIONALE_CHARS]}
+            for t in self.transactions[-recent_trades:][::-1]
+        ] if recent_trades else []
+        data["trade_stats"] = {
+            key: round(value, 2) if isinstance(value, float) else value
+            for key, value in self.trade_stats.model_dump().items()
+        }
+        if self.trade_stats.trade_count > len(data["recent_trades"]):
+            data["more_history"] = "use get_transactions to page through older trades"
+        return json.dumps(data)
+    
+    def report(self) -> str:
+        """Generate the full account report as JSON (recent trades and portfolio points)"""
+        snapshot = self._mark(self.calculate_portfolio_value())
+        write_portfolio_snapshot(self.name, *snapshot)
+        write_log(self.name, "account", "Retrieved account report")
+        return self._full_report(snapshot[1])
+    
+    async def areport(self) -> str:
+        """Generate the full account report as JSON without blocking the event loop"""
+        snapshot = self._mark(await self.acalculate_portfolio_value())
+        await async_database.awrite_portfolio_snapshot(self.name, *snapshot)
+        write_log(self.name, "account", "Retrieved account report")
+        return self._full_report(snapshot[1])
+    
+    def summary(self) -> str:
+        """Generate the compact account summary used in prompts"""
+        snapshot = self._mark(self.calculate_portfolio_value())
+        write_portfolio_snapshot(self.name, *snapshot)
+        write_log(self.name, "account", "Retrieved account summary")
+        return self._summary(snapshot[1])
+    
+    async def asummary(self) -> str:
+        """Generate the compact account summary without blocking the event loop"""
+        snapshot = self._mark(await self.acalculate_portfolio_value())
+        await async_database.awrite_portfolio_snapshot(self.name, *snapshot)
+        write_log(self.name, "account", "Retrieved account summary")
+        return self._summary(snapshot[1])
+    
     def get_strategy(self) -> str:
         """Get current strategy"""
         return self.strategy
@@ -178,6 +410,23 @@ class Account(BaseModel):
     def change_strategy(self, strategy: str) -> str:
         """Update trading strategy"""
         self.strategy = strategy
-        self.save()
+        write_strategy(self.name, strategy)
+        write_log(self.name, "account", "Changed strategy")
+        return f"✅ Strategy updated"
+    
+    async def achange_strategy(self, strategy: str) -> str:
+        """Update trading strategy without blocking the event loop"""
+        self.strategy = strategy
+        await async_database.awrite_strategy(self.name, strategy)
         write_log(self.name, "account", "Changed strategy")
         return f"✅ Strategy updated"
+    
+    def set_model(self, model: str):
+        """Record which model trades this account"""
+        self.model = model
+        write_model(self.name, model)
+    
+    async def aset_model(self, model: str):
+        """Record which model trades this account without blocking the event loop"""
+        self.model = model
+        await async_database.awrite_model(self.name, model)
@@ -0,0 +1,97 @@
+"""Async account persistence for code running on the event loop
+
+Awaitable twins of the account operations in database.py, so trader
+coroutines can wait on disk I/O instead of blocking the loop. Each operation
+runs whole on a database worker thread, using that thread's pooled
+connection: one round trip to the loop per operation, not one per statement.
+Writes share a single worker, so they commit in turn without contending for
+SQLite's write lock; reads go to a few workers of their own, each reading one
+committed snapshot, so they overlap with writes and with each other. Activity
+logs don't need an async twin: write_log() already only enqueues.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core import database
+from src.core.tracing import traced
+
+ASYNC_READ_CONNECTIONS = int(os.getenv("ASYNC_READ_CONNECTIONS", "4"))
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+_worker_connections: Dict[int, Any] = {}  # worker thread id -> the connection it used last
+
+
+def _executor(role: str) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(role)
+        if executor is None:
+            workers = 1 if role == "write" else ASYNC_READ_CONNECTIONS
+            executor = _executors[role] = ThreadPoolExecutor(workers, thread_name_prefix=f"db-{role}")
+        return executor
+
+
+def _call(fn: Callable, args: tuple) -> Any:
+    _worker_connections[threading.get_ident()] = database.get_connection()
+    return fn(*args)
+
+
+async def _run(role: str, fn: Callable, *args) -> Any:
+    """Run a sync database operation on a write or read worker and await its result"""
+    return await asyncio.get_running_loop().run_in_executor(_executor(role), _call, fn, args)
+
+
+async def close():
+    """Stop the database worker threads and close their connections"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        await asyncio.to_thread(executor.shutdown)
+    while _worker_connections:
+        database._release(_worker_connections.popitem()[1])
+
+
+# Account operations
+@traced("db")
+async def awrite_account(name: str, data: Dict[str, Any]):
+    """Save a whole account, replacing any previous state (history only if data carries it)"""
+    await _run("write", database.write_account, name, data)
+
+
+@traced("db")
+async def aread_account(name: str) -> Optional[Dict[str, Any]]:
+    """Load account data"""
+    return await _run("read", database.read_account, name)
+
+
+async def aread_transactions_page(name: str, offset: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+    """One page of an account's trades, newest first, straight from the transactions table"""
+    return await _run("read", database.read_transactions_page, name, offset, limit)
+
+
+@traced("db")
+async def arecord_trade(name: str, balance: float, trade: Dict[str, Any], avg_cost: float, realized_pnl: float):
+    """Append one trade: new balance and P&L, holdings delta and transaction row in one commit"""
+    await _run("write", database.record_trade, name, balance, trade, avg_cost, realized_pnl)
+
+
+@traced("db")
+async def awrite_portfolio_snapshot(name: str, timestamp: str, value: float):
+    """Append one point to an account's portfolio value history and its rollups"""
+    await _run("write", database.write_portfolio_snapshot, name, timestamp, value)
+
+
+@traced("db")
+async def awrite_strategy(name: str, strategy: str):
+    """Update an account's strategy"""
+    await _run("write", database.write_strategy, name, strategy)
+
+
+@traced("db")
+async def awrite_model(name: str, model: str):
+    """Record which model trades an account"""
+    await _run("write", database.write_model, name, model)
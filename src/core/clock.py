@@ -0,0 +1,51 @@
+"""Process-wide clock that backtests can replace with simulated time"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional
+
+_simulated: Optional[datetime] = None
+_listeners: List[Callable[[], None]] = []
+
+
+def now() -> datetime:
+    """Current time: wall clock, or the simulated time during a backtest"""
+    return _simulated if _simulated is not None else datetime.now()
+
+
+def today() -> str:
+    """Current date as YYYY-MM-DD"""
+    return now().strftime("%Y-%m-%d")
+
+
+def is_simulated() -> bool:
+    """True while a backtest is driving the clock"""
+    return _simulated is not None
+
+
+def on_change(listener: Callable[[], None]):
+    """Call listener whenever simulated time is set or cleared (e.g. to drop caches)"""
+    _listeners.append(listener)
+
+
+def set_time(when: Optional[datetime]):
+    """Freeze the clock at a simulated time (None returns to wall-clock time)"""
+    global _simulated
+    _simulated = when
+    for listener in _listeners:
+        listener()
+
+
+def reset():
+    """Return to wall-clock time"""
+    set_time(None)
+
+
+@contextmanager
+def simulated_time(when: datetime) -> Iterator[None]:
+    """Run a block with the clock frozen at a simulated time"""
+    previous = _simulated
+    set_time(when)
+    try:
+        yield
+    finally:
+        set_time(previous)
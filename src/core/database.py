@@ -1,121 +1,780 @@
 """Database operations for trading simulation"""
+import atexit
+import os
 import sqlite3
 import json
-from typing import Dict, List, Tuple, Any, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Any, Optional, Iterator
 from pathlib import Path
 
-DB_PATH = Path("data/trading.db")
+from src.core import clock
+from src.core.ledger import replay_trades
+from src.core.log_writer import LogWriter
+
+DB_PATH = Path(os.getenv("TRADING_DB_PATH", "data/trading.db"))
+
+# Pragmas applied to every pooled connection. WAL lets the dashboard read
+# while the trading floor writes; NORMAL sync is durable across app crashes
+# and only skips the fsync on every commit.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # negative = KiB, ~16 MB page cache
+    "mmap_size": 268435456,  # 256 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_generation = 0  # bumped by close_connections() to invalidate thread handles
+
+
+# Connection management
+def _connect(path: Path) -> sqlite3.Connection:
+    """Open a tuned connection in autocommit mode"""
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for pragma, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+
+def _release(conn: sqlite3.Connection):
+    """Close a pooled connection and forget it"""
+    with _connections_lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    conn.close()
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's long-lived connection, opening it on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.key == (DB_PATH, _generation):
+        return conn
+    if conn is not None:
+        # DB_PATH was repointed (benchmarks, backtests) or the pool was closed
+        _release(conn)
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    _local.conn = _connect(DB_PATH)
+    _local.key = (DB_PATH, _generation)
+    _local.depth = 0
+    return _local.conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Run a block atomically on this thread's connection.
+
+    Nested blocks join the outermost transaction, so helpers can be composed
+    into one commit.
+    """
+    conn = get_connection()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    _local.depth = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+    finally:
+        _local.depth = 0
+
+
+@contextmanager
+def snapshot() -> Iterator[sqlite3.Connection]:
+    """Run a block of reads on this thread's connection against one committed state of the database"""
+    conn = get_connection()
+    if _local.depth:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+
+def close_connections():
+    """Close every pooled connection (all threads)"""
+    global _generation
+    with _connections_lock:
+        conns = list(_connections)
+        _connections.clear()
+        _generation += 1
+    for conn in conns:
+        conn.close()
+
 
 def init_database():
     """Initialize database with required tables"""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Accounts table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS accounts (
-        name TEXT PRIMARY KEY,
-        data TEXT NOT NULL
-    )
-    """)
-    
-    # Market data cache table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS market_data (
-        date TEXT PRIMARY KEY,
-        data TEXT NOT NULL
-    )
-    """)
-    
-    # Activity logs table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        timestamp TEXT NOT NULL,
-        type TEXT NOT NULL,
-        message TEXT NOT NULL
+    with transaction() as conn:
+        if _has_legacy_accounts(conn):
+            conn.execute("ALTER TABLE accounts RENAME TO accounts_legacy")
+
+        # Accounts table (one row per trader, history lives in child tables,
+        # running trade aggregates are kept on the row)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            name TEXT PRIMARY KEY,
+            balance REAL NOT NULL,
+            strategy TEXT NOT NULL DEFAULT '',
+            model TEXT NOT NULL DEFAULT '',
+            trade_count INTEGER NOT NULL DEFAULT 0,
+            buy_count INTEGER NOT NULL DEFAULT 0,
+            sell_count INTEGER NOT NULL DEFAULT 0,
+            bought_value REAL NOT NULL DEFAULT 0,
+            sold_value REAL NOT NULL DEFAULT 0,
+            first_trade_at TEXT,
+            last_trade_at TEXT,
+            winning_sells INTEGER NOT NULL DEFAULT 0,
+            realized_pnl REAL NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        # version is bumped by every write to an account, so readers can skip unchanged ones
+        _add_missing_columns(conn, "accounts", {"version": "INTEGER NOT NULL DEFAULT 0",
+                                                "model": "TEXT NOT NULL DEFAULT ''"})
+        added_stats = _add_missing_columns(conn, "accounts", TRADE_STAT_COLUMNS)
+
+        # Current positions with their average cost
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS holdings (
+            name TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            avg_cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, symbol)
+        ) WITHOUT ROWID
+        """)
+
+        # Append-only trade history
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            price REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            rationale TEXT NOT NULL,
+            realized_pnl REAL NOT NULL DEFAULT 0
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_name ON transactions (name, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_holdings_symbol ON holdings (symbol)")
+
+        # Cost basis arrived after the position tables: replay history once to fill it in
+        added = [
+            _add_missing_columns(conn, "holdings", {"avg_cost": "REAL NOT NULL DEFAULT 0"}),
+            _add_missing_columns(conn, "accounts", {"realized_pnl": "REAL NOT NULL DEFAULT 0"}),
+            _add_missing_columns(conn, "transactions", {"realized_pnl": "REAL NOT NULL DEFAULT 0"}),
+        ]
+        if any(added):
+            backfill_cost_basis(conn)
+        if added_stats or added[2]:
+            conn.execute(SQL_REFRESH_TRADE_STATS)
+
+        # Append-only portfolio value history
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            value REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_name ON portfolio_snapshots (name, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_time ON portfolio_snapshots (name, timestamp)")
+
+        # OHLC rollups of the portfolio value history, maintained on every
+        # snapshot so charts of long histories never read raw points
+        had_rollups = _table_exists(conn, "portfolio_rollups")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_rollups (
+            name TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (name, resolution, bucket)
+        ) WITHOUT ROWID
+        """)
+        if not had_rollups:
+            backfill_rollups(conn)
+
+        # How far back each history level has been pruned (see src/core/timeseries.py)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS series_retention (
+            level TEXT PRIMARY KEY,
+            pruned_before TEXT NOT NULL
+        )
+        """)
+
+        # Market data cache, one row per (date, symbol) so lookups hit the
+        # primary key instead of parsing a whole day's universe
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS market_prices (
+            date TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            price REAL NOT NULL,
+            PRIMARY KEY (date, symbol)
+        ) WITHOUT ROWID
+        """)
+
+        # Activity logs table
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created_at REAL NOT NULL DEFAULT 0
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_name ON logs (name, id)")
+        # Rows from before epoch timestamps only have a time of day: they age from the upgrade
+        if _add_missing_columns(conn, "logs", {"created_at": "REAL NOT NULL DEFAULT 0"}):
+            conn.execute("UPDATE logs SET created_at = ?", (clock.now().timestamp(),))
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_created ON logs (created_at)")
+
+        # Full-text index over log type and message (see src/core/logs.py),
+        # kept in step with the logs table by triggers
+        if not _table_exists(conn, "logs_fts"):
+            conn.execute(
+                "CREATE VIRTUAL TABLE logs_fts USING fts5(type, message, content='logs', content_rowid='id')"
+            )
+            conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+            INSERT INTO logs_fts (rowid, type, message) VALUES (new.id, new.type, new.message);
+        END
+        """)
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+            INSERT INTO logs_fts (logs_fts, rowid, type, message) VALUES ('delete', old.id, old.type, old.message);
+        END
+        """)
+
+        # Change feed for live views (see src/core/events.py), written in the
+        # same commit as the change it announces
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """)
+
+        # Timed spans of the agent loop (see src/core/tracing.py)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS spans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            span_id TEXT NOT NULL,
+            trace_id TEXT NOT NULL,
+            parent_id TEXT,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            trader TEXT,
+            model TEXT,
+            started_at REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            status TEXT NOT NULL,
+            attrs TEXT NOT NULL DEFAULT '{}'
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_started ON spans (started_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans (trace_id)")
+
+        if _table_exists(conn, "accounts_legacy"):
+            migrate_account_blobs(conn)
+        if _table_exists(conn, "market_data"):
+            migrate_market_blobs(conn)
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> bool:
+    """ALTER TABLE in any columns an older database lacks; True if any were added"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    missing = [column for column in columns if column not in existing]
+    for column in missing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {columns[column]}")
+    return bool(missing)
+
+
+def _has_legacy_accounts(conn: sqlite3.Connection) -> bool:
+    """True if accounts still uses the old (name, data JSON) layout"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(accounts)")]
+    return "data" in columns
+
+
+def backfill_cost_basis(conn: sqlite3.Connection):
+    """Set average costs and realized P&L of every account (and each of its sales) from its trade history"""
+    for (name,) in conn.execute("SELECT name FROM accounts").fetchall():
+        trades = conn.execute(
+            "SELECT id, symbol, quantity, price FROM transactions WHERE name = ? ORDER BY id", (name,)
+        ).fetchall()
+        ledger, realized = replay_trades(trade[1:] for trade in trades)
+        conn.executemany(
+            "UPDATE transactions SET realized_pnl = ? WHERE id = ?",
+            [(pnl, trade[0]) for trade, pnl in zip(trades, realized) if pnl]
+        )
+        conn.executemany(
+            "UPDATE holdings SET avg_cost = ? WHERE name = ? AND symbol = ?",
+            [(avg_cost, name, symbol) for symbol, avg_cost in ledger.avg_costs.items()]
+        )
+        conn.execute("UPDATE accounts SET realized_pnl = ? WHERE name = ?", (ledger.realized_pnl, name))
+
+
+def backfill_rollups(conn: sqlite3.Connection):
+    """Fold the existing portfolio value history into the rollup table"""
+    cursor = conn.execute("SELECT name, timestamp, value FROM portfolio_snapshots ORDER BY id")
+    conn.executemany(SQL_UPSERT_ROLLUP, (row for point in cursor for row in rollup_rows(*point)))
+
+
+def migrate_account_blobs(conn: sqlite3.Connection):
+    """Convert rows of the old JSON-blob accounts table into the normalized tables"""
+    for name, blob in conn.execute("SELECT name, data FROM accounts_legacy").fetchall():
+        write_account(name, json.loads(blob))
+    conn.execute("DROP TABLE accounts_legacy")
+    print("Migrated account blobs to normalized tables")
+
+
+def migrate_market_blobs(conn: sqlite3.Connection):
+    """Explode the old per-date JSON market_data rows into market_prices"""
+    for date, blob in conn.execute("SELECT date, data FROM market_data").fetchall():
+        write_market(date, json.loads(blob))
+    conn.execute("DROP TABLE market_data")
+    print("Migrated market data blobs to market_prices")
+
+# Account operations (statements shared with src/core/async_database.py)
+SQL_UPSERT_ACCOUNT = (
+    "INSERT INTO accounts (name, balance, strategy, model, realized_pnl) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (name) DO UPDATE SET balance = excluded.balance, strategy = excluded.strategy, "
+    "model = excluded.model, realized_pnl = excluded.realized_pnl, version = version + 1"
+)
+SQL_SELECT_ACCOUNT = (
+    "SELECT balance, strategy, realized_pnl, model, trade_count, buy_count, sell_count, bought_value, "
+    "sold_value, first_trade_at, last_trade_at, winning_sells FROM accounts WHERE name = ?"
+)
+SQL_SELECT_HOLDINGS = "SELECT symbol, quantity, avg_cost FROM holdings WHERE name = ?"
+SQL_SELECT_TRANSACTIONS = (
+    "SELECT symbol, quantity, price, timestamp, rationale, realized_pnl FROM (SELECT id, symbol, quantity, "
+    "price, timestamp, rationale, realized_pnl FROM transactions WHERE name = ? ORDER BY id DESC LIMIT ?) "
+    "ORDER BY id"
+)
+SQL_SELECT_TRANSACTIONS_PAGE = (
+    "SELECT symbol, quantity, price, timestamp, rationale, realized_pnl FROM transactions "
+    "WHERE name = ? ORDER BY id DESC LIMIT ? OFFSET ?"
+)
+TRANSACTION_TAIL = 50  # recent trades loaded with an account; get_transactions pages the rest
+SQL_SELECT_SNAPSHOTS = (
+    "SELECT timestamp, value FROM (SELECT id, timestamp, value FROM portfolio_snapshots "
+    "WHERE name = ? ORDER BY id DESC LIMIT ?) ORDER BY id"
+)
+SNAPSHOT_TAIL = 100  # recent points loaded with an account; charts read src/core/timeseries.py
+SQL_INSERT_HOLDING = "INSERT INTO holdings (name, symbol, quantity, avg_cost) VALUES (?, ?, ?, ?)"
+SQL_INSERT_TRANSACTION = (
+    "INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale, realized_pnl) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_INSERT_SNAPSHOT = "INSERT INTO portfolio_snapshots (name, timestamp, value) VALUES (?, ?, ?)"
+SQL_UPDATE_BALANCE = "UPDATE accounts SET balance = ?, realized_pnl = ?, version = version + 1 WHERE name = ?"
+SQL_UPDATE_STRATEGY = "UPDATE accounts SET strategy = ?, version = version + 1 WHERE name = ?"
+SQL_UPDATE_MODEL = "UPDATE accounts SET model = ?, version = version + 1 WHERE name = ?"
+SQL_BUMP_VERSION = "UPDATE accounts SET version = version + 1 WHERE name = ?"
+SQL_INSERT_EVENT = "INSERT INTO events (name, kind, payload, created_at) VALUES (?, ?, ?, ?)"
+SQL_ADD_HOLDING = (
+    "INSERT INTO holdings (name, symbol, quantity, avg_cost) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (name, symbol) DO UPDATE SET quantity = quantity + excluded.quantity, avg_cost = excluded.avg_cost"
+)
+SQL_DELETE_EMPTY_HOLDING = "DELETE FROM holdings WHERE name = ? AND symbol = ? AND quantity = 0"
+SERIES_TABLES = ("portfolio_snapshots", "portfolio_rollups")
+
+# Rollup buckets are the start of the snapshot's minute, hour or day, cut
+# straight from its "YYYY-MM-DD HH:MM:SS" timestamp. Snapshots arrive in time
+# order, so the latest one in a bucket is its close.
+ROLLUP_BUCKETS = {"1m": (16, ":00"), "1h": (13, ":00:00"), "1d": (10, " 00:00:00")}
+SQL_UPSERT_ROLLUP = (
+    "INSERT INTO portfolio_rollups (name, resolution, bucket, open, high, low, close, count) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, 1) ON CONFLICT (name, resolution, bucket) DO UPDATE SET "
+    "high = MAX(high, excluded.high), low = MIN(low, excluded.low), close = excluded.close, count = count + 1"
+)
+
+# Running trade aggregates on the accounts row: bumped per trade, recomputed
+# from history only when a whole account is written
+TRADE_STAT_COLUMNS = {
+    "trade_count": "INTEGER NOT NULL DEFAULT 0",
+    "buy_count": "INTEGER NOT NULL DEFAULT 0",
+    "sell_count": "INTEGER NOT NULL DEFAULT 0",
+    "bought_value": "REAL NOT NULL DEFAULT 0",
+    "sold_value": "REAL NOT NULL DEFAULT 0",
+    "first_trade_at": "TEXT",
+    "last_trade_at": "TEXT",
+    "winning_sells": "INTEGER NOT NULL DEFAULT 0",  # sales that realized a profit
+}
+SQL_ADD_TRADE_STATS = (
+    "UPDATE accounts SET trade_count = trade_count + 1, buy_count = buy_count + (? > 0), "
+    "sell_count = sell_count + (? < 0), bought_value = bought_value + ?, sold_value = sold_value + ?, "
+    "first_trade_at = COALESCE(first_trade_at, ?), last_trade_at = ?, winning_sells = winning_sells + (? > 0) "
+    "WHERE name = ?"
+)
+SQL_REFRESH_TRADE_STATS = (
+    "UPDATE accounts SET (trade_count, buy_count, sell_count, bought_value, sold_value, "
+    "first_trade_at, last_trade_at, winning_sells) = ("
+    "SELECT COUNT(*), COALESCE(SUM(quantity > 0), 0), COALESCE(SUM(quantity < 0), 0), "
+    "COALESCE(SUM(CASE WHEN quantity > 0 THEN price * quantity END), 0), "
+    "COALESCE(SUM(CASE WHEN quantity < 0 THEN -price * quantity END), 0), "
+    "MIN(timestamp), MAX(timestamp), COALESCE(SUM(realized_pnl > 0), 0) "
+    "FROM transactions WHERE transactions.name = accounts.name)"
+)
+SQL_REFRESH_ACCOUNT_TRADE_STATS = SQL_REFRESH_TRADE_STATS + " WHERE name = ?"
+
+
+def transaction_row(name: str, trade: Dict[str, Any]) -> tuple:
+    """Parameters for SQL_INSERT_TRANSACTION"""
+    return (name, trade["symbol"], trade["quantity"], trade["price"],
+            trade["timestamp"], trade["rationale"], trade.get("realized_pnl", 0.0))
+
+
+def transaction_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """Trades as dicts from SQL_SELECT_TRANSACTIONS / SQL_SELECT_TRANSACTIONS_PAGE rows"""
+    return [
+        {"symbol": s, "quantity": q, "price": p, "timestamp": ts, "rationale": r, "realized_pnl": pnl}
+        for s, q, p, ts, r, pnl in rows
+    ]
+
+
+def rollup_rows(name: str, timestamp: str, value: float) -> List[tuple]:
+    """Parameters for SQL_UPSERT_ROLLUP, one per resolution"""
+    return [
+        (name, resolution, timestamp[:cut] + suffix, value, value, value, value)
+        for resolution, (cut, suffix) in ROLLUP_BUCKETS.items()
+    ]
+
+
+def series_rows(name: str, points: List[tuple]) -> Tuple[List[tuple], List[tuple]]:
+    """SQL_INSERT_SNAPSHOT and SQL_UPSERT_ROLLUP parameters for a whole history"""
+    return (
+        [(name, timestamp, value) for timestamp, value in points],
+        [row for timestamp, value in points for row in rollup_rows(name, timestamp, value)],
     )
-    """)
-    
-    conn.commit()
-    conn.close()
 
-# Account operations
+
+def event_row(name: str, kind: str, **payload) -> tuple:
+    """Parameters for SQL_INSERT_EVENT (created_at is wall time: events are about delivery, not the market)"""
+    return (name, kind, json.dumps(payload), time.time())
+
+
+def trade_stats_row(name: str, trade: Dict[str, Any]) -> tuple:
+    """Parameters for SQL_ADD_TRADE_STATS"""
+    quantity = trade["quantity"]
+    value = abs(quantity) * trade["price"]
+    return (quantity, quantity, value if quantity > 0 else 0.0, value if quantity < 0 else 0.0,
+            trade["timestamp"], trade["timestamp"], trade.get("realized_pnl", 0.0), name)
+
+
+def account_from_rows(name: str, account_row: tuple, holdings: List[tuple],
+                      transactions: List[tuple], snapshots: List[tuple]) -> Dict[str, Any]:
+    """Assemble the Account field dict from the normalized rows"""
+    return {
+        "name": name,
+        "balance": account_row[0],
+        "strategy": account_row[1],
+        "realized_pnl": account_row[2],
+        "model": account_row[3],
+        "trade_stats": dict(zip(TRADE_STAT_COLUMNS, account_row[4:])),
+        "holdings": {symbol: quantity for symbol, quantity, _ in holdings},
+        "cost_basis": {symbol: avg_cost for symbol, _, avg_cost in holdings},
+        "transactions": transaction_dicts(transactions),
+        "portfolio_value_time_series": [tuple(row) for row in snapshots],
+    }
+
+
+def account_ledger_rows(name: str, data: Dict[str, Any]) -> Tuple[List[tuple], float, List[tuple]]:
+    """Holdings rows with average cost, realized P&L and transaction rows for a whole-account write
+
+    Accounts saved before cost basis existed (no "cost_basis" key, or trades
+    without "realized_pnl") get them by replaying their transactions.
+    """
+    trades = data.get("transactions", [])
+    if "cost_basis" in data and all("realized_pnl" in t for t in trades):
+        cost_basis, realized_pnl = data["cost_basis"], data.get("realized_pnl", 0.0)
+    else:
+        ledger, realized = replay_trades((t["symbol"], t["quantity"], t["price"]) for t in trades)
+        trades = [{**t, "realized_pnl": pnl} for t, pnl in zip(trades, realized)]
+        if "cost_basis" in data:
+            cost_basis, realized_pnl = data["cost_basis"], data.get("realized_pnl", 0.0)
+        else:
+            cost_basis, realized_pnl = ledger.avg_costs, ledger.realized_pnl
+    holdings = [
+        (name, symbol, quantity, cost_basis.get(symbol, 0.0))
+        for symbol, quantity in data.get("holdings", {}).items()
+    ]
+    return holdings, realized_pnl, [transaction_row(name, t) for t in trades]
+
+
 def write_account(name: str, data: Dict[str, Any]):
-    """Save account data"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR REPLACE INTO accounts (name, data) VALUES (?, ?)",
-        (name.lower(), json.dumps(data))
-    )
-    conn.commit()
-    conn.close()
+    """Save a whole account, replacing any previous state
+
+    The trade history is replaced only if data carries "transactions", and
+    the value history only if it carries "portfolio_value_time_series";
+    otherwise the stored histories (and their trade stats) are kept.
+    """
+    name = name.lower()
+    holdings, realized_pnl, transactions = account_ledger_rows(name, data)
+    with transaction() as conn:
+        conn.execute(SQL_UPSERT_ACCOUNT, (name, data["balance"], data.get("strategy", ""), data.get("model", ""),
+                                          realized_pnl))
+        conn.execute("DELETE FROM holdings WHERE name = ?", (name,))
+        conn.executemany(SQL_INSERT_HOLDING, holdings)
+        if "transactions" in data:
+            conn.execute("DELETE FROM transactions WHERE name = ?", (name,))
+            conn.executemany(SQL_INSERT_TRANSACTION, transactions)
+            conn.execute(SQL_REFRESH_ACCOUNT_TRADE_STATS, (name,))
+        if "portfolio_value_time_series" in data:
+            for table in SERIES_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE name = ?", (name,))
+            snapshots, rollups = series_rows(name, data["portfolio_value_time_series"])
+            conn.executemany(SQL_INSERT_SNAPSHOT, snapshots)
+            conn.executemany(SQL_UPSERT_ROLLUP, rollups)
+        conn.execute(SQL_INSERT_EVENT, event_row(name, "account"))
 
 def read_account(name: str) -> Optional[Dict[str, Any]]:
     """Load account data"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT data FROM accounts WHERE name = ?", (name.lower(),))
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        return json.loads(result[0])
-    return None
+    name = name.lower()
+    with snapshot() as conn:
+        result = conn.execute(SQL_SELECT_ACCOUNT, (name,)).fetchone()
+        if not result:
+            return None
+        return account_from_rows(
+            name,
+            result,
+            conn.execute(SQL_SELECT_HOLDINGS, (name,)).fetchall(),
+            conn.execute(SQL_SELECT_TRANSACTIONS, (name, TRANSACTION_TAIL)).fetchall(),
+            conn.execute(SQL_SELECT_SNAPSHOTS, (name, SNAPSHOT_TAIL)).fetchall(),
+        )
+
+def read_transactions_page(name: str, offset: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+    """One page of an account's trades, newest first, straight from the transactions table"""
+    return transaction_dicts(get_connection().execute(
+        SQL_SELECT_TRANSACTIONS_PAGE, (name.lower(), limit, offset)
+    ).fetchall())
+
+def record_trade(name: str, balance: float, trade: Dict[str, Any], avg_cost: float, realized_pnl: float):
+    """Append one trade: new balance and P&L, holdings delta and transaction row in one commit"""
+    name = name.lower()
+    with transaction() as conn:
+        conn.execute(SQL_UPDATE_BALANCE, (balance, realized_pnl, name))
+        conn.execute(SQL_ADD_HOLDING, (name, trade["symbol"], trade["quantity"], avg_cost))
+        conn.execute(SQL_DELETE_EMPTY_HOLDING, (name, trade["symbol"]))
+        conn.execute(SQL_INSERT_TRANSACTION, transaction_row(name, trade))
+        conn.execute(SQL_ADD_TRADE_STATS, trade_stats_row(name, trade))
+        conn.execute(SQL_INSERT_EVENT, event_row(name, "trade", symbol=trade["symbol"],
+                                                 quantity=trade["quantity"], price=trade["price"]))
+
+def write_portfolio_snapshot(name: str, timestamp: str, value: float):
+    """Append one point to an account's portfolio value history and its rollups"""
+    name = name.lower()
+    with transaction() as conn:
+        conn.execute(SQL_INSERT_SNAPSHOT, (name, timestamp, value))
+        conn.executemany(SQL_UPSERT_ROLLUP, rollup_rows(name, timestamp, value))
+        conn.execute(SQL_BUMP_VERSION, (name,))
+        conn.execute(SQL_INSERT_EVENT, event_row(name, "account", value=value))
+
+def write_strategy(name: str, strategy: str):
+    """Update an account's strategy"""
+    name = name.lower()
+    with transaction() as conn:
+        conn.execute(SQL_UPDATE_STRATEGY, (strategy, name))
+        conn.execute(SQL_INSERT_EVENT, event_row(name, "account"))
+
+def write_model(name: str, model: str):
+    """Record which model trades an account"""
+    name = name.lower()
+    with transaction() as conn:
+        conn.execute(SQL_UPDATE_MODEL, (model, name))
+        conn.execute(SQL_INSERT_EVENT, event_row(name, "account"))
 
 # Market data operations
+MAX_SQL_VARIABLES = 900  # stay under SQLITE_MAX_VARIABLE_NUMBER on old builds
+
 def write_market(date: str, data: Dict[str, float]):
-    """Cache market data for a date"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR REPLACE INTO market_data (date, data) VALUES (?, ?)",
-        (date, json.dumps(data))
-    )
-    conn.commit()
-    conn.close()
+    """Cache market data for a date (bulk insert)"""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO market_prices (date, symbol, price) VALUES (?, ?, ?)",
+            [(date, symbol, price) for symbol, price in data.items() if price is not None]
+        )
 
 def read_market(date: str) -> Optional[Dict[str, float]]:
-    """Load cached market data"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT data FROM market_data WHERE date = ?", (date,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        return json.loads(result[0])
-    return None
+    """Load the whole cached universe for a date"""
+    results = get_connection().execute(
+        "SELECT symbol, price FROM market_prices WHERE date = ?", (date,)
+    ).fetchall()
+    return dict(results) if results else None
+
+def has_market(date: str) -> bool:
+    """Check whether any prices are cached for a date"""
+    return get_connection().execute(
+        "SELECT 1 FROM market_prices WHERE date = ? LIMIT 1", (date,)
+    ).fetchone() is not None
+
+def read_market_price(date: str, symbol: str) -> Optional[float]:
+    """Look up one cached price"""
+    result = get_connection().execute(
+        "SELECT price FROM market_prices WHERE date = ? AND symbol = ?", (date, symbol)
+    ).fetchone()
+    return result[0] if result else None
+
+def read_market_prices(date: str, symbols: List[str]) -> Dict[str, float]:
+    """Look up cached prices for a basket of symbols (missing symbols are omitted)"""
+    conn = get_connection()
+    symbols = list(dict.fromkeys(symbols))
+    prices = {}
+    for i in range(0, len(symbols), MAX_SQL_VARIABLES):
+        chunk = symbols[i:i + MAX_SQL_VARIABLES]
+        placeholders = ", ".join("?" * len(chunk))
+        prices.update(conn.execute(
+            f"SELECT symbol, price FROM market_prices WHERE date = ? AND symbol IN ({placeholders})",
+            (date, *chunk)
+        ).fetchall())
+    return prices
+
+def list_market_dates(start: str, end: str) -> List[str]:
+    """Dates between start and end (inclusive) that have cached prices"""
+    results = get_connection().execute(
+        "SELECT DISTINCT date FROM market_prices WHERE date BETWEEN ? AND ? ORDER BY date",
+        (start, end)
+    ).fetchall()
+    return [row[0] for row in results]
+
+def import_market_history(source: Path, start: str, end: str) -> int:
+    """Copy cached prices for a date range from another database file"""
+    conn = get_connection()
+    conn.execute("ATTACH DATABASE ? AS source", (str(source),))
+    try:
+        with transaction():
+            cursor = conn.execute(
+                "INSERT OR REPLACE INTO market_prices (date, symbol, price) "
+                "SELECT date, symbol, price FROM source.market_prices WHERE date BETWEEN ? AND ?",
+                (start, end)
+            )
+        return cursor.rowcount
+    finally:
+        conn.execute("DETACH DATABASE source")
 
 # Logging operations
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.2"))
+
+
+def _insert_logs(records: List[Tuple[str, str, str, str, float]]):
+    """Write a batch of queued log records in one commit"""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO logs (name, timestamp, type, message, created_at) VALUES (?, ?, ?, ?, ?)",
+            records
+        )
+        counts = {}
+        for record in records:
+            counts[record[0]] = counts.get(record[0], 0) + 1
+        conn.executemany(SQL_INSERT_EVENT, [event_row(name, "log", count=n) for name, n in counts.items()])
+
+
+_log_writer = LogWriter(_insert_logs, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL)
+
+
 def write_log(name: str, log_type: str, message: str):
-    """Write activity log"""
-    from datetime import datetime
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    cursor.execute(
-        "INSERT INTO logs (name, timestamp, type, message) VALUES (?, ?, ?, ?)",
-        (name.lower(), timestamp, log_type, message)
-    )
-    conn.commit()
-    conn.close()
+    """Write activity log (queued, committed in batches by a background thread)"""
+    now = clock.now()
+    _log_writer.put((name.lower(), now.strftime("%Y-%m-%d %H:%M:%S"), log_type, message, now.timestamp()))
+
+
+def flush_logs(timeout: Optional[float] = None) -> bool:
+    """Block until every queued log record has been committed"""
+    return _log_writer.flush(timeout)
+
+
+def log_stats() -> Dict[str, Any]:
+    """Activity log writer counters: written, retried and dropped records"""
+    return _log_writer.stats()
+
 
 def read_log(name: str, last_n: int = 10) -> List[Tuple[str, str, str]]:
     """Read recent activity logs"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
+    if _log_writer.pending():
+        flush_logs()
+    results = get_connection().execute(
         "SELECT timestamp, type, message FROM logs WHERE name = ? ORDER BY id DESC LIMIT ?",
         (name.lower(), last_n)
-    )
-    results = cursor.fetchall()
-    conn.close()
+    ).fetchall()
     return list(reversed(results))
 
+
+# Event feed operations
+EVENT_RETENTION = float(os.getenv("EVENT_RETENTION", "3600"))  # seconds events are kept for slow readers
+
+
+def read_events(after_id: int, limit: int = 1000) -> List[Tuple[int, str, str, str, float]]:
+    """(id, name, kind, payload, created_at) of events newer than after_id, oldest first"""
+    return get_connection().execute(
+        "SELECT id, name, kind, payload, created_at FROM events WHERE id > ? ORDER BY id LIMIT ?",
+        (after_id, limit)
+    ).fetchall()
+
+
+def last_event_id() -> int:
+    return get_connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+
+def prune_events(max_age: float = EVENT_RETENTION) -> int:
+    """Delete events older than max_age seconds; returns how many"""
+    with transaction() as conn:
+        return conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - max_age,)).rowcount
+
+
+def read_versions(names: List[str]) -> Dict[str, Tuple[int, int]]:
+    """(account version, latest log id) per account: either moving means there is something new to show"""
+    if _log_writer.pending():
+        flush_logs()
+    conn = get_connection()
+    versions = {}
+    for name in names:
+        name = name.lower()
+        account = conn.execute("SELECT version FROM accounts WHERE name = ?", (name,)).fetchone()
+        log_id = conn.execute("SELECT MAX(id) FROM logs WHERE name = ?", (name,)).fetchone()[0]
+        versions[name] = (account[0] if account else -1, log_id or 0)
+    return versions
+
 # Initialize database on import
 init_database()
+# atexit runs handlers last-in first-out: drain the log queue, then close
+atexit.register(close_connections)
+atexit.register(_log_writer.close)
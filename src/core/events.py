@@ -0,0 +1,112 @@
+"""Local event bus: account, trade and log events for live views
+
+Writers append to the events table in the same commit as the change they
+announce (see database.py), so an event becomes visible exactly when its data
+does, to any process sharing the database file - no broker, works offline.
+EventBus tails the table from one background thread: every
+EVENT_POLL_INTERVAL seconds it reads SQLite's data_version, a counter that
+only moves when another connection commits, and queries for new events only
+when it has. Subscribers block on their own queue, so an idle dashboard does
+no work beyond that counter check.
+"""
+import json
+import os
+import queue
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from src.core import database
+
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.2"))  # seconds
+READ_BATCH = 1000
+
+
+class Event(NamedTuple):
+    id: int
+    name: str  # account the event is about
+    kind: str  # "account", "trade" or "log"
+    payload: Dict[str, Any]
+    created_at: float
+
+
+class EventBus:
+    """Fans new rows of the events table out to subscriber queues"""
+
+    def __init__(self, poll_interval: float = EVENT_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers: List["queue.Queue[List[Event]]"] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_id = 0
+        self.checks = 0
+        self.reads = 0
+        self.delivered = 0
+
+    def subscribe(self) -> "queue.Queue[List[Event]]":
+        """Queue that receives each batch of new events (starts the tail thread on first use)"""
+        subscription: "queue.Queue[List[Event]]" = queue.Queue()
+        with self._lock:
+            self._subscribers.append(subscription)
+            if self._thread is None:
+                self.last_id = database.last_event_id()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: "queue.Queue[List[Event]]"):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Stop the tail thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    def poll(self) -> List[Event]:
+        """Read and deliver everything newer than the last event seen"""
+        events = []
+        while True:
+            rows = database.read_events(self.last_id, READ_BATCH)
+            self.reads += 1
+            events.extend(Event(id_, name, kind, json.loads(payload), created_at)
+                          for id_, name, kind, payload, created_at in rows)
+            if rows:
+                self.last_id = rows[-1][0]
+            if len(rows) < READ_BATCH:
+                break
+        if events:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscription in subscribers:
+                subscription.put(events)
+            self.delivered += len(events)
+        return events
+
+    def _run(self):
+        conn, version = None, None
+        while not self._stop.wait(self.poll_interval):
+            self.checks += 1
+            current = database.get_connection()
+            data_version = current.execute("PRAGMA data_version").fetchone()[0]
+            if current is conn and data_version == version:
+                continue
+            conn, version = current, data_version
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Event bus read failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {"subscribers": subscribers, "checks": self.checks, "reads": self.reads,
+                "delivered": self.delivered, "last_id": self.last_id}
+
+
+event_bus = EventBus()
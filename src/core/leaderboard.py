@@ -0,0 +1,93 @@
+"""Leaderboard: return, P&L, turnover and win rate per trader and per model
+
+Everything is computed by one aggregate query over the accounts row and the
+open holdings - never by loading accounts or replaying transactions. The
+accounts row already carries the running trade statistics (counts, traded
+value, winning sales, realized P&L; see TRADE_STAT_COLUMNS in database.py)
+and each holding its average cost, so only the open positions need pricing:
+their distinct symbols are priced once and passed to SQLite as a JSON
+object. Cost grows with traders and open positions, not with trade history.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from src.core.accounts import INITIAL_BALANCE
+from src.core.database import get_connection
+from src.core.market import get_share_prices
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "50"))
+
+# Sort keys callers may pass, mapped to result columns (all sorted descending, NULLs last)
+SORT_KEYS = {
+    "return": "return_pct",
+    "value": "value",
+    "realized_pnl": "realized_pnl",
+    "unrealized_pnl": "unrealized_pnl",
+    "turnover": "turnover",
+    "win_rate": "win_rate",
+    "trade_count": "trade_count",
+}
+
+# One row per account; prices arrive as a JSON object {symbol: price}
+SQL_TRADER_ROWS = """
+    WITH prices AS (SELECT key AS symbol, value AS price FROM json_each(:prices)),
+    positions AS (
+        SELECT h.name, SUM(h.quantity * p.price) AS market_value,
+               SUM(h.quantity * (p.price - h.avg_cost)) AS unrealized_pnl
+        FROM holdings h JOIN prices p ON p.symbol = h.symbol
+        GROUP BY h.name
+    )
+    SELECT a.name, a.model, a.balance + COALESCE(pos.market_value, 0) AS value,
+           a.realized_pnl, COALESCE(pos.unrealized_pnl, 0) AS unrealized_pnl,
+           a.bought_value + a.sold_value AS traded, a.trade_count, a.sell_count, a.winning_sells
+    FROM accounts a LEFT JOIN positions pos ON pos.name = a.name
+"""
+
+SQL_TRADERS = f"""
+    SELECT name, model, value, value / :initial - 1 AS return_pct, realized_pnl, unrealized_pnl,
+           traded / :initial AS turnover, trade_count,
+           CASE WHEN sell_count THEN 1.0 * winning_sells / sell_count END AS win_rate
+    FROM ({SQL_TRADER_ROWS})
+    WHERE :model IS NULL OR model = :model
+"""
+
+SQL_MODELS = f"""
+    SELECT model, COUNT(*) AS traders, SUM(value) AS value,
+           SUM(value) / (COUNT(*) * :initial) - 1 AS return_pct,
+           SUM(realized_pnl) AS realized_pnl, SUM(unrealized_pnl) AS unrealized_pnl,
+           SUM(traded) / (COUNT(*) * :initial) AS turnover, SUM(trade_count) AS trade_count,
+           CASE WHEN SUM(sell_count) THEN 1.0 * SUM(winning_sells) / SUM(sell_count) END AS win_rate
+    FROM ({SQL_TRADER_ROWS})
+    GROUP BY model
+"""
+
+
+def _prices_json() -> str:
+    """Current price of every symbol someone holds, as a JSON object"""
+    conn = get_connection()
+    symbols = [symbol for (symbol,) in conn.execute("SELECT DISTINCT symbol FROM holdings")]
+    return json.dumps(get_share_prices(symbols) if symbols else {})
+
+
+def _ranked(sql: str, params: Dict[str, Any], sort: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}, got {sort!r}")
+    sql += f" ORDER BY {SORT_KEYS[sort]} DESC LIMIT :limit"
+    cursor = get_connection().execute(
+        sql, {**params, "prices": _prices_json(), "initial": INITIAL_BALANCE,
+              "limit": -1 if limit is None else limit}
+    )
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+def trader_leaderboard(sort: str = "return", limit: Optional[int] = LEADERBOARD_SIZE,
+                       model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Top traders by a SORT_KEYS metric, optionally only those of one model"""
+    return _ranked(SQL_TRADERS, {"model": model}, sort, limit)
+
+
+def model_leaderboard(sort: str = "return", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Models ranked by the combined results of their traders"""
+    return _ranked(SQL_MODELS, {}, sort, limit)
@@ -0,0 +1,113 @@
+"""Per-account position ledger: quantity, average cost and realized P&L
+
+Buys and sells update the ledger in O(1) using average-cost accounting, so
+cost basis and realized P&L never require replaying the trade history.
+Market value is kept as a running total: mark() re-values only the symbols
+whose price actually moved.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PositionLedger:
+    """Open positions of one account plus its running realized P&L"""
+
+    def __init__(self, positions: Optional[Dict[str, Tuple[int, float]]] = None, realized_pnl: float = 0.0):
+        self.quantities: Dict[str, int] = {}
+        self.avg_costs: Dict[str, float] = {}
+        for symbol, (quantity, avg_cost) in (positions or {}).items():
+            if quantity:
+                self.quantities[symbol] = quantity
+                self.avg_costs[symbol] = avg_cost
+        self.realized_pnl = realized_pnl
+        self.prices: Dict[str, float] = {}  # last mark per symbol
+        self.market_value = 0.0  # sum of quantity * last mark over marked positions
+
+    def buy(self, symbol: str, quantity: int, price: float):
+        """Add to a position; average cost moves toward the fill price"""
+        held = self.quantities.get(symbol, 0)
+        total = held + quantity
+        self.avg_costs[symbol] = (held * self.avg_costs.get(symbol, 0.0) + quantity * price) / total
+        self.quantities[symbol] = total
+        if symbol in self.prices:
+            self.market_value += quantity * self.prices[symbol]
+
+    def sell(self, symbol: str, quantity: int, price: float) -> float:
+        """Reduce a position at average cost; returns the P&L realized by this sale"""
+        held = self.quantities.get(symbol, 0)
+        if quantity > held:
+            raise ValueError(f"Cannot sell {quantity} shares of {symbol}. Only have {held}")
+        realized = quantity * (price - self.avg_costs[symbol])
+        self.realized_pnl += realized
+        if symbol in self.prices:
+            self.market_value -= quantity * self.prices[symbol]
+        if quantity == held:
+            del self.quantities[symbol], self.avg_costs[symbol]
+            self.prices.pop(symbol, None)
+        else:
+            self.quantities[symbol] = held - quantity
+        return realized
+
+    def apply(self, symbol: str, quantity: int, price: float):
+        """Apply a signed trade (positive buys, negative sells)"""
+        if quantity > 0:
+            self.buy(symbol, quantity, price)
+        else:
+            self.sell(symbol, -quantity, price)
+
+    def unmarked(self) -> List[str]:
+        """Open positions that have never been priced"""
+        return [symbol for symbol in self.quantities if symbol not in self.prices]
+
+    def mark(self, prices: Dict[str, float]) -> int:
+        """Re-value positions whose price changed; returns how many moved"""
+        moved = 0
+        for symbol, price in prices.items():
+            quantity = self.quantities.get(symbol)
+            if quantity is None:
+                continue
+            previous = self.prices.get(symbol)
+            if previous == price:
+                continue
+            self.market_value += quantity * (price - (previous or 0.0))
+            self.prices[symbol] = price
+            moved += 1
+        return moved
+
+    def cost_basis(self) -> float:
+        """Total cost of the open positions"""
+        return sum(self.quantities[s] * self.avg_costs[s] for s in self.quantities)
+
+    def unrealized_pnl(self) -> float:
+        """Market value over cost basis for the open (marked) positions"""
+        return self.market_value - sum(self.quantities[s] * self.avg_costs[s] for s in self.prices)
+
+    def positions(self) -> List[Dict[str, float]]:
+        """Per-symbol quantity, average cost, mark, market value and unrealized P&L"""
+        rows = []
+        for symbol, quantity in self.quantities.items():
+            price = self.prices.get(symbol)
+            avg_cost = self.avg_costs[symbol]
+            rows.append({
+                "symbol": symbol,
+                "quantity": quantity,
+                "avg_cost": avg_cost,
+                "price": price,
+                "market_value": quantity * price if price is not None else None,
+                "unrealized_pnl": quantity * (price - avg_cost) if price is not None else None,
+            })
+        return rows
+
+
+def replay_trades(trades: Iterable[Tuple[str, int, float]]) -> Tuple[PositionLedger, List[float]]:
+    """Rebuild a ledger from (symbol, signed quantity, price) trades in order, with each trade's realized P&L"""
+    ledger = PositionLedger()
+    realized = []
+    for symbol, quantity, price in trades:
+        if quantity > 0:
+            ledger.buy(symbol, quantity, price)
+            realized.append(0.0)
+            continue
+        # Histories that start mid-way can sell shares bought before they begin
+        quantity = min(-quantity, ledger.quantities.get(symbol, 0))
+        realized.append(ledger.sell(symbol, quantity, price) if quantity else 0.0)
+    return ledger, realized
@@ -0,0 +1,162 @@
+"""Background group-commit writer for high-volume append-only records"""
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+_STOP = object()
+
+
+class LogWriter:
+    """Queue records and hand them to a sink in batches from a background thread.
+
+    A batch is flushed once it reaches batch_size records or flush_interval
+    seconds after its first record arrived, whichever comes first. A failed
+    write (e.g. "database is locked" under contention) is retried with
+    exponential backoff; the batch is only given up, and counted in
+    records_dropped, once max_retries attempts have failed.
+
+    Backpressure: when max_queue records are already waiting, put() blocks a
+    plain thread until there is room, but never an event loop thread - there
+    the record is dropped and counted instead, so a slow disk can't stall
+    every coroutine on the loop.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[Any]], None],
+        batch_size: int = 256,
+        flush_interval: float = 0.2,
+        max_queue: int = 10000,
+        name: str = "log-writer",
+        max_retries: int = 5,
+        retry_delay: float = 0.05,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay  # first backoff; doubles per attempt, capped at 2s
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.records_written = 0
+        self.batches_written = 0
+        self.retries = 0
+        self.records_dropped = 0
+        self.last_error: Optional[str] = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def put(self, record: Any):
+        """Enqueue one record; written synchronously once the writer is closed"""
+        if self._closed:
+            self._write([record])
+            return
+        self._ensure_started()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._queue.put(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.records_dropped += 1
+
+    def _write(self, batch: List[Any]):
+        """Hand a batch to the sink, retrying failures with backoff before dropping it"""
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sink(batch)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt == self.max_retries:
+                    self.records_dropped += len(batch)
+                    return
+                self.retries += 1
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+            else:
+                self.records_written += len(batch)
+                self.batches_written += 1
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {"written": self.records_written, "batches": self.batches_written, "retries": self.retries,
+                "dropped": self.records_dropped, "pending": self.pending(), "last_error": self.last_error}
+
+    def pending(self) -> int:
+        """Approximate number of records not yet handed to the sink"""
+        return self._queue.qsize()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued before this call has been written"""
+        if self._closed or self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Flush remaining records and stop the background thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+                # Flush markers and shutdown cut the batch short
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stop:
+                # Drain whatever raced in behind the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
@@ -0,0 +1,115 @@
+"""Activity log search and retention
+
+Every log line is indexed by the logs_fts FTS5 table (type and message) in
+the same commit that writes it, so search_logs() answers "every line that
+mentions NVDA" or "every error" from the index instead of scanning the
+table. archive_logs() keeps the live table bounded: rows older than
+LOG_RETENTION_DAYS are moved, a month at a time, into monthly archive
+databases (logs-YYYY-MM.db under LOG_ARCHIVE_DIR) with one INSERT ... SELECT
+and one DELETE each, then dropped from the live table and its index.
+"""
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.core import clock, database
+from src.core.database import flush_logs, get_connection, transaction
+
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "30"))
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "")  # default: log_archive/ next to the database; "off" deletes instead
+SEARCH_LIMIT = 100
+
+LogRow = Tuple[int, str, str, str, str]  # id, name, timestamp, type, message
+
+
+def match_query(text: str = "", log_type: Optional[str] = None) -> str:
+    """FTS5 query matching every word of text in the message (a trailing * matches a prefix) and the type"""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    query = f"message : ({' '.join(terms)})" if terms else ""
+    if log_type:
+        type_filter = 'type : "{}"'.format(log_type.replace('"', '""'))
+        query = f"{query} AND {type_filter}" if query else type_filter
+    return query
+
+
+def search_logs(text: str = "", name: Optional[str] = None, log_type: Optional[str] = None,
+                limit: int = SEARCH_LIMIT) -> List[LogRow]:
+    """Live log lines matching text and/or type, optionally for one trader, newest first"""
+    query = match_query(text, log_type)
+    flush_logs()
+    conn = get_connection()
+    if not query:
+        where, params = ("WHERE name = ?", [name.lower()]) if name else ("", [])
+        return conn.execute(
+            f"SELECT id, name, timestamp, type, message FROM logs {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+    sql = ("SELECT l.id, l.name, l.timestamp, l.type, l.message FROM logs_fts "
+           "JOIN logs l ON l.id = logs_fts.rowid WHERE logs_fts MATCH ?")
+    params = [query]
+    if name:
+        sql += " AND l.name = ?"
+        params.append(name.lower())
+    return conn.execute(sql + " ORDER BY logs_fts.rowid DESC LIMIT ?", (*params, limit)).fetchall()
+
+
+def archive_dir() -> Optional[Path]:
+    """Where monthly archives go, or None when archiving is off"""
+    if LOG_ARCHIVE_DIR.lower() == "off":
+        return None
+    return Path(LOG_ARCHIVE_DIR) if LOG_ARCHIVE_DIR else database.DB_PATH.parent / "log_archive"
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def archive_logs(now: Optional[datetime] = None, retention_days: float = LOG_RETENTION_DAYS) -> Dict[str, int]:
+    """Move log rows older than the retention window to monthly archives; returns rows per month"""
+    cutoff = ((now or clock.now()) - timedelta(days=retention_days)).timestamp()
+    target = archive_dir()
+    flush_logs()
+    conn = get_connection()
+    moved = {}
+    while True:
+        oldest = conn.execute("SELECT MIN(created_at) FROM logs WHERE created_at < ?", (cutoff,)).fetchone()[0]
+        if oldest is None:
+            return moved
+        month = datetime.fromtimestamp(oldest).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        bounds = (month.timestamp(), min(_next_month(month).timestamp(), cutoff))
+        label = month.strftime("%Y-%m")
+        if target is None:
+            with transaction():
+                moved[label] = conn.execute(
+                    "DELETE FROM logs WHERE created_at >= ? AND created_at < ?", bounds
+                ).rowcount
+            continue
+        target.mkdir(parents=True, exist_ok=True)
+        conn.execute("ATTACH DATABASE ? AS archive", (str(target / f"logs-{label}.db"),))
+        try:
+            with transaction():
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS archive.logs (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """)
+                conn.execute(
+                    "INSERT OR IGNORE INTO archive.logs SELECT id, name, timestamp, type, message, created_at "
+                    "FROM logs WHERE created_at >= ? AND created_at < ?", bounds
+                )
+                moved[label] = conn.execute(
+                    "DELETE FROM logs WHERE created_at >= ? AND created_at < ?", bounds
+                ).rowcount
+        finally:
+            conn.execute("DETACH DATABASE archive")
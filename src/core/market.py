@@ -1,15 +1,20 @@
 """Market data operations - Polygon.io integration with fallback to simulated data"""
 import os
-import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Dict
+from typing import Callable, Dict, Iterable, List, Tuple
 from dotenv import load_dotenv
 
 # Import database after it's available
 import sys
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from core.database import write_market, read_market
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from src.core.database import write_market, read_market, has_market, read_market_price, read_market_prices
+from src.core.simulator import simulated_market
+from src.core import clock
 
 load_dotenv()
 
@@ -19,12 +24,146 @@ polygon_plan = os.getenv("POLYGON_PLAN", "free")
 is_paid_polygon = polygon_plan == "paid"
 is_realtime_polygon = polygon_plan == "realtime"
 
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "60"))  # seconds
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", "4096"))  # symbols
+
+
+class PriceCache:
+    """Thread-safe TTL + LRU price cache with single-flight fetches.
+
+    Concurrent misses for the same symbol wait on the first caller's fetch
+    instead of each going upstream.
+    """
+
+    def __init__(self, ttl: float = PRICE_CACHE_TTL, maxsize: int = PRICE_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # symbol -> (expires, price)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, symbol: str, fetch: Callable[[str], float]) -> float:
+        """Return a fresh cached price or fetch it (once, however many callers ask)"""
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(symbol)
+            leader = future is None
+            if leader:
+                future = self._inflight[symbol] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            price = fetch(symbol)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[symbol]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(symbol, price)
+            del self._inflight[symbol]
+        future.set_result(price)
+        return price
+
+    def get_many(self, symbols: Iterable[str],
+                 fetch_many: Callable[[List[str]], Dict[str, float]]) -> Dict[str, float]:
+        """Return prices for a basket, fetching all stale symbols in one upstream call"""
+        prices, waiting, leading = {}, {}, []
+        with self._lock:
+            now = time.monotonic()
+            for symbol in dict.fromkeys(symbols):
+                entry = self._entries.get(symbol)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(symbol)
+                    self.hits += 1
+                    prices[symbol] = entry[1]
+                elif symbol in self._inflight:
+                    self.coalesced += 1
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    self.misses += 1
+                    self._inflight[symbol] = Future()
+                    leading.append(symbol)
+
+        if leading:
+            try:
+                fetched = fetch_many(leading)
+            except BaseException as e:
+                with self._lock:
+                    futures = [self._inflight.pop(symbol) for symbol in leading]
+                for future in futures:
+                    future.set_exception(e)
+                raise
+
+            with self._lock:
+                futures = []
+                for symbol in leading:
+                    prices[symbol] = fetched.get(symbol, 0.0)
+                    self._store(symbol, prices[symbol])
+                    futures.append(self._inflight.pop(symbol))
+            for symbol, future in zip(leading, futures):
+                future.set_result(prices[symbol])
+
+        for symbol, future in waiting.items():
+            prices[symbol] = future.result()
+        return prices
+
+    def _store(self, symbol: str, price: float):
+        self._entries[symbol] = (time.monotonic() + self.ttl, price)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached price"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+price_cache = PriceCache()
+# Cached prices belong to one moment; a backtest moving the clock invalidates them
+clock.on_change(price_cache.clear)
+
+
+@lru_cache(maxsize=1)
+def _polygon_client():
+    """Shared Polygon REST client (keeps its HTTP session alive between calls)"""
+    from polygon import RESTClient
+    return RESTClient(polygon_api_key)
+
 
 def get_all_share_prices_polygon_eod() -> Dict[str, float]:
     """Get end-of-day prices from Polygon.io"""
     try:
-        from polygon import RESTClient
-        client = RESTClient(polygon_api_key)
+        client = _polygon_client()
         
         # Get last close date from SPY
         probe = client.get_previous_close_agg("SPY")[0]
@@ -38,35 +177,64 @@ def get_all_share_prices_polygon_eod() -> Dict[str, float]:
         return {}
 
 
-@lru_cache(maxsize=2)
-def get_market_for_prior_date(today: str) -> Dict[str, float]:
-    """Get or cache market data for a date"""
-    market_data = read_market(today)
-    if not market_data and polygon_api_key:
+@lru_cache(maxsize=32)
+def ensure_market_for_prior_date(today: str) -> bool:
+    """Make sure the market store holds prices for a date, loading them once"""
+    if has_market(today):
+        return True
+    if polygon_api_key:
         market_data = get_all_share_prices_polygon_eod()
         if market_data:
             write_market(today, market_data)
-    return market_data or {}
+            return True
+    return False
+
+
+def get_market_for_prior_date(today: str) -> Dict[str, float]:
+    """Get or cache the whole market universe for a date"""
+    if not ensure_market_for_prior_date(today):
+        return {}
+    return read_market(today) or {}
 
 
 def get_share_price_polygon_eod(symbol: str) -> float:
     """Get share price from Polygon (end of day)"""
-    today = datetime.now().date().strftime("%Y-%m-%d")
-    market_data = get_market_for_prior_date(today)
-    return market_data.get(symbol, 0.0)
+    today = clock.today()
+    if not ensure_market_for_prior_date(today):
+        return 0.0
+    return read_market_price(today, symbol) or 0.0
+
+
+def get_share_prices_polygon_eod(symbols: List[str]) -> Dict[str, float]:
+    """Get a basket of prices from Polygon (end of day) in one store lookup"""
+    today = clock.today()
+    if not ensure_market_for_prior_date(today):
+        return {}
+    return read_market_prices(today, symbols)
 
 
 def get_share_price_polygon_min(symbol: str) -> float:
     """Get share price from Polygon (15-min delay for paid tier)"""
     try:
-        from polygon import RESTClient
-        client = RESTClient(polygon_api_key)
-        result = client.get_snapshot_ticker("stocks", symbol)
+        result = _polygon_client().get_snapshot_ticker("stocks", symbol)
         return result.min.close or result.prev_day.close
     except:
         return 0.0
 
 
+def get_share_prices_polygon_min(symbols: List[str]) -> Dict[str, float]:
+    """Get a basket of prices from one Polygon snapshot call (paid tier)"""
+    try:
+        snapshots = _polygon_client().get_snapshot_all("stocks", tickers=list(symbols))
+        return {
+            snapshot.ticker: (snapshot.min.close if snapshot.min else None) or snapshot.prev_day.close
+            for snapshot in snapshots
+        }
+    except Exception as e:
+        print(f"Polygon snapshot failed: {e}")
+        return {}
+
+
 def get_share_price_polygon(symbol: str) -> float:
     """Get share price from Polygon based on plan"""
     if is_paid_polygon:
@@ -75,8 +243,33 @@ def get_share_price_polygon(symbol: str) -> float:
         return get_share_price_polygon_eod(symbol)
 
 
+def get_share_prices_polygon(symbols: List[str]) -> Dict[str, float]:
+    """Get a basket of prices from Polygon based on plan"""
+    if is_paid_polygon:
+        return get_share_prices_polygon_min(symbols)
+    else:
+        return get_share_prices_polygon_eod(symbols)
+
+
 def get_share_price(symbol: str) -> float:
-    """Get share price with fallback to simulated data"""
+    """Get share price (cached for PRICE_CACHE_TTL seconds)"""
+    return price_cache.get(symbol, fetch_share_price)
+
+
+def get_share_prices(symbols: Iterable[str]) -> Dict[str, float]:
+    """Get prices for a basket of symbols, resolving cache misses in one upstream pass"""
+    return price_cache.get_many(symbols, fetch_share_prices)
+
+
+def price_cache_stats() -> Dict[str, float]:
+    """Price cache hit/miss counters"""
+    return price_cache.stats()
+
+
+def fetch_share_price(symbol: str) -> float:
+    """Get share price from upstream with fallback to simulated data"""
+    if clock.is_simulated():
+        return fetch_share_prices([symbol])[symbol]
     if polygon_api_key:
         try:
             price = get_share_price_polygon(symbol)
@@ -85,6 +278,30 @@ def get_share_price(symbol: str) -> float:
         except Exception as e:
             print(f"Polygon API failed for {symbol}: {e}")
     
-    # Fallback: simulated prices (random but consistent per symbol)
-    random.seed(hash(symbol + datetime.now().strftime("%Y-%m-%d")))
-    return float(random.randint(10, 500))
+    return simulated_price(symbol)
+
+
+def fetch_share_prices(symbols: List[str]) -> Dict[str, float]:
+    """Get a basket of prices from upstream, simulating any symbol it can't price"""
+    prices = {}
+    if clock.is_simulated():
+        # Backtests replay stored history only; live endpoints would leak today's prices
+        prices = read_market_prices(clock.today(), symbols)
+    elif polygon_api_key:
+        try:
+            prices = {
+                symbol: price for symbol, price in get_share_prices_polygon(symbols).items()
+                if price and price > 0
+            }
+        except Exception as e:
+            print(f"Polygon API failed for {len(symbols)} symbols: {e}")
+    
+    missing = [symbol for symbol in symbols if symbol not in prices]
+    if missing:
+        prices.update(simulated_market.prices(missing, clock.now()))
+    return prices
+
+
+def simulated_price(symbol: str) -> float:
+    """Fallback: simulated price, identical in every process (see simulator.py)"""
+    return simulated_market.price(symbol, clock.now())
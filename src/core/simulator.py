@@ -0,0 +1,172 @@
+"""Deterministic simulated market used when no real price is available
+
+Prices are a pure function of (seed, symbol, time): every process - trading
+floor, dashboard, backtests - sees the same price for the same symbol and
+minute, and nothing touches the global `random` state.
+
+Each symbol follows a geometric Brownian motion. Daily levels come from a
+Brownian motion built with Levy's midpoint construction, so any single day
+costs ~15 draws instead of replaying history. Intraday paths are Brownian
+bridges between consecutive daily levels, so one day's close equals the next
+day's open. Draws are counter-based hashes of (symbol key, counter), which
+lets whole universes be generated with NumPy in one shot.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+SIMULATION_SEED = os.getenv("SIMULATION_SEED", "ai-trading-simulation")
+
+EPOCH = date(1980, 1, 1)  # day 0 of the simulated history
+CENTER = date(2025, 1, 1)  # prices sit at each symbol's base level here
+HORIZON_BITS = 15  # 2**15 days of history (~89 years)
+TRADING_MINUTES = 390  # 09:30-16:00
+OPEN_MINUTE = 9 * 60 + 30
+PATH_CACHE_SIZE = 4096  # cached (symbol, day) intraday paths, ~3 KB each
+
+# Counter namespaces so every draw comes from a distinct counter
+_PARAM_COUNTER = 1 << 60
+_NODE_COUNTER = 1 << 56
+_MINUTE_COUNTER = 1 << 52
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer, vectorized (uint64 arithmetic wraps)"""
+    z = x + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+def _uniforms(keys: np.ndarray, counters: np.ndarray) -> np.ndarray:
+    """Uniform [0, 1) draws, shape (len(keys), len(counters))"""
+    mixed = _splitmix64(keys[:, None] ^ _splitmix64(counters.astype(np.uint64))[None, :])
+    return (mixed >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def _normals(keys: np.ndarray, counters: np.ndarray) -> np.ndarray:
+    """Standard normal draws via Box-Muller, shape (len(keys), len(counters))"""
+    counters = np.asarray(counters, dtype=np.uint64) * np.uint64(2)
+    u1 = _uniforms(keys, counters)
+    u2 = _uniforms(keys, counters + np.uint64(1))
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+
+class SimulatedMarket:
+    """Stable, vectorized simulated prices for arbitrary symbol universes"""
+
+    def __init__(self, seed: str = SIMULATION_SEED, cache_size: int = PATH_CACHE_SIZE):
+        self._key = hashlib.blake2b(seed.encode(), digest_size=32).digest()
+        self._paths: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def symbol_keys(self, symbols: List[str]) -> np.ndarray:
+        """Keyed 64-bit hash per symbol (independent of PYTHONHASHSEED)"""
+        return np.array([
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8, key=self._key).digest(), "little")
+            for s in symbols
+        ], dtype=np.uint64)
+
+    def _parameters(self, keys: np.ndarray):
+        """Per-symbol base price, annual drift and annual volatility"""
+        u = _uniforms(keys, np.arange(_PARAM_COUNTER, _PARAM_COUNTER + 3, dtype=np.uint64))
+        base = np.exp(np.log(10.0) + u[:, 0] * (np.log(500.0) - np.log(10.0)))
+        drift = -0.05 + 0.20 * u[:, 1]
+        vol = 0.15 + 0.45 * u[:, 2]
+        return base, drift, vol
+
+    def _brownian_levels(self, keys: np.ndarray, day: int):
+        """W(day) and W(day + 1) in day units via Levy's midpoint construction"""
+        a, b = 0, 1 << HORIZON_BITS
+        w_a = np.zeros(len(keys))
+        top = _NODE_COUNTER + (1 << 40)  # endpoint draw, outside the midpoint node range
+        w_b = np.sqrt(b) * _normals(keys, np.array([top]))[:, 0]
+        while b - a > 1:
+            mid = (a + b) // 2
+            # A node is identified by its interval start and length
+            node = _NODE_COUNTER + (a << (HORIZON_BITS + 1)) + (b - a)
+            w_mid = (w_a + w_b) / 2 + np.sqrt((b - a) / 4) * _normals(keys, np.array([node]))[:, 0]
+            if day < mid:
+                b, w_b = mid, w_mid
+            else:
+                a, w_a = mid, w_mid
+        return w_a, w_b
+
+    def intraday_paths(self, symbols: Iterable[str], day: date) -> np.ndarray:
+        """Prices for every minute 0..390 of a day, shape (len(symbols), 391)"""
+        symbols = list(symbols)
+        index = (day - EPOCH).days
+        if not 0 <= index < (1 << HORIZON_BITS) - 1:
+            raise ValueError(f"{day} is outside the simulated history")
+
+        keys = self.symbol_keys(symbols)
+        base, drift, vol = self._parameters(keys)
+        w_center, _ = self._brownian_levels(keys, (CENTER - EPOCH).days)
+        w_day, w_next = self._brownian_levels(keys, index)
+
+        # Brownian bridge over the session: pinned to W(day) at the open and
+        # W(day + 1) at the close
+        minutes = np.arange(1, TRADING_MINUTES + 1, dtype=np.uint64)
+        steps = _normals(keys, _MINUTE_COUNTER + np.uint64(index) * np.uint64(512) + minutes)
+        walk = np.concatenate([np.zeros((len(keys), 1)), np.cumsum(steps, axis=1)], axis=1)
+        walk /= np.sqrt(TRADING_MINUTES)
+        t = np.linspace(0.0, 1.0, TRADING_MINUTES + 1)
+        bridge = walk - t[None, :] * walk[:, -1:]
+        w = w_day[:, None] + t[None, :] * (w_next - w_day)[:, None] + bridge
+
+        years = (index - (CENTER - EPOCH).days + t) / 365.0
+        log_price = (
+            np.log(base)[:, None]
+            + drift[:, None] * years[None, :]
+            + (vol / np.sqrt(365.0))[:, None] * (w - w_center[:, None])
+        )
+        return np.exp(log_price)
+
+    @staticmethod
+    def minute_of_session(when: datetime) -> int:
+        """Minutes since the 09:30 open, clamped to the session"""
+        minute = when.hour * 60 + when.minute - OPEN_MINUTE
+        return min(max(minute, 0), TRADING_MINUTES)
+
+    def prices(self, symbols: Iterable[str], when: datetime) -> Dict[str, float]:
+        """Prices for a basket at a moment, generating uncached paths in one batch"""
+        day = when.date()
+        minute = self.minute_of_session(when)
+        symbols = list(dict.fromkeys(symbols))
+        rows = {}
+        with self._lock:
+            for symbol in symbols:
+                path = self._paths.get((symbol, day))
+                if path is not None:
+                    self._paths.move_to_end((symbol, day))
+                    rows[symbol] = path
+
+        missing = [s for s in symbols if s not in rows]
+        if missing:
+            paths = self.intraday_paths(missing, day)
+            with self._lock:
+                for symbol, path in zip(missing, paths):
+                    rows[symbol] = path
+                    self._paths[(symbol, day)] = path
+                while len(self._paths) > self._cache_size:
+                    self._paths.popitem(last=False)
+
+        # Penny floor so rounding never yields a zero ("invalid symbol") price
+        return {symbol: max(round(float(rows[symbol][minute]), 2), 0.01) for symbol in symbols}
+
+    def price(self, symbol: str, when: datetime) -> float:
+        """Price of one symbol at a moment"""
+        return self.prices([symbol], when)[symbol]
+
+
+simulated_market = SimulatedMarket()
@@ -0,0 +1,163 @@
+"""Portfolio value history for charts: retention, rollups and downsampling
+
+Every snapshot is stored raw in portfolio_snapshots and folded into
+portfolio_rollups (1-minute, hourly and daily OHLC) in the same commit.
+prune_history() drops raw points and the finer rollups once they age out of
+their retention window; daily rollups are kept forever. read_series() picks
+the finest level that still covers the requested range with a manageable
+number of points, then thins it with Largest-Triangle-Three-Buckets so a
+chart gets at most max_points that keep the peaks and troughs of the full
+series, however long the history is.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.core import clock
+from src.core.database import ROLLUP_BUCKETS, get_connection, transaction
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+OVERSAMPLE = 4  # a level is read if it has at most this many points per chart point
+
+# Days each level is kept; None keeps it forever
+RETENTION_DAYS: Dict[str, Optional[float]] = {
+    "raw": float(os.getenv("PORTFOLIO_RAW_RETENTION_DAYS", "7")),
+    "1m": float(os.getenv("PORTFOLIO_MINUTE_RETENTION_DAYS", "30")),
+    "1h": float(os.getenv("PORTFOLIO_HOURLY_RETENTION_DAYS", "365")),
+    "1d": None,
+}
+LEVELS = ("raw", "1m", "1h", "1d")  # finest first
+
+
+def bucket_start(timestamp: str, resolution: str) -> str:
+    """Start of the rollup bucket a timestamp falls in"""
+    cut, suffix = ROLLUP_BUCKETS[resolution]
+    return timestamp[:cut] + suffix
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    kept = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = range(end, next_end) if end < next_end else range(n - 1, n)
+        avg_x = sum(xs[j] for j in span) / len(span)
+        avg_y = sum(ys[j] for j in span) / len(span)
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def _pruned_before(conn, level: str) -> Optional[str]:
+    row = conn.execute("SELECT pruned_before FROM series_retention WHERE level = ?", (level,)).fetchone()
+    return row[0] if row else None
+
+
+def _level_query(level: str, columns: str) -> str:
+    if level == "raw":
+        return (f"SELECT {columns} FROM portfolio_snapshots "
+                "WHERE name = ? AND timestamp >= ? AND timestamp <= ?")
+    return (f"SELECT {columns} FROM portfolio_rollups "
+            f"WHERE name = ? AND resolution = '{level}' AND bucket >= ? AND bucket <= ?")
+
+
+def read_series(name: str, start: Optional[str] = None, end: Optional[str] = None,
+                max_points: int = CHART_MAX_POINTS) -> Tuple[str, List[Tuple[str, float]]]:
+    """(level, [(timestamp, value)]) for a chart of at most max_points
+
+    Rollup levels contribute each bucket's low and high at the bucket's start
+    time (in the order the bucket most likely moved), so spikes survive.
+    """
+    name = name.lower()
+    conn = get_connection()
+    if start is None:
+        # Daily rollups are never pruned, so they tell where the history begins
+        start = conn.execute(
+            "SELECT MIN(bucket) FROM portfolio_rollups WHERE name = ? AND resolution = '1d'", (name,)
+        ).fetchone()[0]
+        if start is None:
+            return LEVELS[0], []
+    for level in LEVELS:
+        pruned = _pruned_before(conn, level)
+        if level != LEVELS[-1] and pruned is not None and start < pruned:
+            continue  # part of the range is gone at this resolution
+        since = start if level == "raw" else bucket_start(start, level)
+        bounds = (name, since, end or "9999")
+        if level != LEVELS[-1]:
+            # Count no further than the cap, so skipping a dense level stays cheap
+            cap = max_points * OVERSAMPLE // (1 if level == "raw" else 2)
+            count = conn.execute(f"SELECT COUNT(*) FROM ({_level_query(level, '1')} LIMIT ?)",
+                                 (*bounds, cap + 1)).fetchone()[0]
+            if count > cap:
+                continue
+        if level == "raw":
+            rows = conn.execute(_level_query(level, "timestamp, value") + " ORDER BY timestamp", bounds).fetchall()
+        else:
+            rows = []
+            for bucket, open_, high, low, close in conn.execute(
+                    _level_query(level, "bucket, open, high, low, close") + " ORDER BY bucket", bounds):
+                extremes = (low, high) if close >= open_ else (high, low)
+                rows.extend((bucket, value) for value in extremes)
+        if len(rows) <= max_points:
+            return level, rows
+        xs = [datetime.fromisoformat(timestamp).timestamp() for timestamp, _ in rows]
+        ys = [value for _, value in rows]
+        return level, [rows[i] for i in lttb(xs, ys, max_points)]
+    return LEVELS[-1], []
+
+
+def read_rollups(name: str, resolution: str, start: Optional[str] = None,
+                 end: Optional[str] = None) -> List[Tuple[str, float, float, float, float, int]]:
+    """(bucket, open, high, low, close, count) rows of one resolution, oldest first"""
+    since = bucket_start(start, resolution) if start else ""
+    return get_connection().execute(
+        _level_query(resolution, "bucket, open, high, low, close, count") + " ORDER BY bucket",
+        (name.lower(), since, end or "9999")
+    ).fetchall()
+
+
+def prune_history(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Delete history older than each level's retention; returns rows deleted per level"""
+    now = now or clock.now()
+    deleted = {}
+    with transaction() as conn:
+        for level, days in RETENTION_DAYS.items():
+            if days is None:
+                continue
+            cutoff = (now - timedelta(days=days)).strftime(TIME_FORMAT)
+            if level == "raw":
+                cursor = conn.execute("DELETE FROM portfolio_snapshots WHERE timestamp < ?", (cutoff,))
+            else:
+                # Only whole buckets: the one straddling the cutoff stays complete
+                cutoff = bucket_start(cutoff, level)
+                cursor = conn.execute(
+                    "DELETE FROM portfolio_rollups WHERE resolution = ? AND bucket < ?", (level, cutoff)
+                )
+            deleted[level] = cursor.rowcount
+            if cursor.rowcount:
+                conn.execute(
+                    "INSERT INTO series_retention (level, pruned_before) VALUES (?, ?) "
+                    "ON CONFLICT (level) DO UPDATE SET pruned_before = MAX(pruned_before, excluded.pruned_before)",
+                    (level, cutoff)
+                )
+    return deleted
@@ -0,0 +1,221 @@
+"""Lightweight tracing for the agent loop: nested, timed spans in SQLite
+
+A span times one step - a trading session, a trader's run, a turn, an LLM
+call, a tool call or a database write - and records its parent, so each
+session is one tree: session → trader → turn → llm / tool → db. The current
+span lives in a contextvar, so nesting follows the code (including tasks
+started with asyncio.gather) with nothing passed around; trader and model
+are inherited from the enclosing span. Finished spans are queued and
+committed to the spans table in batches by a background LogWriter, so a span
+costs the caller a few microseconds. TRACING=off turns every span into a
+no-op. trace_report.py summarizes latency percentiles per model, tool and
+trader.
+"""
+import atexit
+import functools
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.database import get_connection, transaction
+from src.core.log_writer import LogWriter
+
+TRACING = os.getenv("TRACING", "on").lower() != "off"
+TRACE_RETENTION_DAYS = float(os.getenv("TRACE_RETENTION_DAYS", "7"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "1.0"))  # seconds spans wait to be batched
+SPAN_BATCH_SIZE = 512
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed step; use as a (sync or async) context manager"""
+    __slots__ = ("span_id", "trace_id", "parent_id", "kind", "name", "trader", "model", "attrs",
+                 "started_at", "_start", "_token")
+
+    def __init__(self, kind: str, name: str, trader: Optional[str] = None, model: Optional[str] = None,
+                 **attrs: Any):
+        self.kind = kind
+        self.name = name
+        self.trader = trader
+        self.model = model
+        self.attrs = attrs
+
+    def set(self, **attrs: Any):
+        """Attach attributes known only once the step has run (token counts; error= marks it failed)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id, self.parent_id = self.span_id, None
+        else:
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+            self.trader = self.trader or parent.trader
+            self.model = self.model or parent.model
+        self._token = _current.set(self)
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        _span_writer.put((
+            self.span_id, self.trace_id, self.parent_id, self.kind, self.name, self.trader, self.model,
+            self.started_at, duration_ms, "error" if "error" in self.attrs else "ok", self.attrs,
+        ))
+        return False
+
+    async def __aenter__(self) -> "Span":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class _NoSpan:
+    """Stand-in returned while tracing is off"""
+
+    def set(self, **attrs: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(kind: str, name: str, **attrs: Any):
+    """Span for one step, child of the current one (trader= and model= are inherited when omitted)"""
+    return Span(kind, name, **attrs) if TRACING else _NO_SPAN
+
+
+def traced(kind: str):
+    """Decorator running every call of a coroutine function in a span named after it"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not TRACING:
+                return await fn(*args, **kwargs)
+            with Span(kind, fn.__name__):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _insert_spans(rows: List[tuple]):
+    """Write a batch of finished spans in one commit (attributes are serialized here, off the caller)"""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO spans (span_id, trace_id, parent_id, kind, name, trader, model, started_at, "
+            "duration_ms, status, attrs) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(*row[:-1], json.dumps(row[-1], default=str)) for row in rows]
+        )
+
+
+_span_writer = LogWriter(_insert_spans, batch_size=SPAN_BATCH_SIZE, flush_interval=TRACE_FLUSH_INTERVAL,
+                         name="span-writer")
+
+
+def flush_spans(timeout: Optional[float] = None) -> bool:
+    """Block until every finished span has been committed"""
+    return _span_writer.flush(timeout)
+
+
+def prune_spans(max_age_days: float = TRACE_RETENTION_DAYS) -> int:
+    """Delete spans older than max_age_days; returns how many"""
+    with transaction() as conn:
+        return conn.execute(
+            "DELETE FROM spans WHERE started_at < ?", (time.time() - max_age_days * 86400,)
+        ).rowcount
+
+
+# Reporting
+GROUPINGS = {
+    # report: (span kind, column grouped by)
+    "model": ("llm", "model"),
+    "tool": ("tool", "name"),
+    "trader": ("turn", "trader"),
+    "db": ("db", "name"),
+}
+
+
+def _pick(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def latency_report(by: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Count, error count and p50/p95/p99/max milliseconds per group of one GROUPINGS report"""
+    kind, column = GROUPINGS[by]
+    flush_spans()
+    rows = get_connection().execute(
+        f"SELECT COALESCE({column}, '?'), duration_ms, status FROM spans "
+        f"WHERE kind = ? AND started_at >= ? ORDER BY 1, duration_ms",
+        (kind, since or 0.0)
+    ).fetchall()
+    groups: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for key, duration_ms, status in rows:
+        groups.setdefault(key, []).append(duration_ms)
+        errors[key] = errors.get(key, 0) + (status != "ok")
+    return [
+        {"key": key, "count": len(durations), "errors": errors[key], "p50": _pick(durations, 50),
+         "p95": _pick(durations, 95), "p99": _pick(durations, 99), "max": durations[-1]}
+        for key, durations in groups.items()
+    ]
+
+
+def token_report(since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+    """Mean prompt and completion tokens per LLM call, per model"""
+    flush_spans()
+    rows = get_connection().execute(
+        "SELECT model, AVG(json_extract(attrs, '$.prompt_tokens')), "
+        "AVG(json_extract(attrs, '$.completion_tokens')) FROM spans "
+        "WHERE kind = 'llm' AND started_at >= ? GROUP BY model",
+        (since or 0.0,)
+    ).fetchall()
+    return {model or "?": {"prompt_tokens": prompt or 0.0, "completion_tokens": completion or 0.0}
+            for model, prompt, completion in rows}
+
+
+def read_trace(trace_id: str) -> List[Tuple[str, Optional[str], str, str, float, str, str]]:
+    """(span_id, parent_id, kind, name, duration_ms, status, attrs) of one trace, in start order"""
+    flush_spans()
+    return get_connection().execute(
+        "SELECT span_id, parent_id, kind, name, duration_ms, status, attrs FROM spans "
+        "WHERE trace_id = ? ORDER BY started_at, id", (trace_id,)
+    ).fetchall()
+
+
+def recent_traces(limit: int = 10) -> List[Tuple[str, str, float, float]]:
+    """(trace_id, name, started_at, duration_ms) of the latest root spans"""
+    flush_spans()
+    return get_connection().execute(
+        "SELECT trace_id, name, started_at, duration_ms FROM spans WHERE parent_id IS NULL "
+        "ORDER BY started_at DESC LIMIT ?", (limit,)
+    ).fetchall()
+
+
+# Drain queued spans before the database connections close (atexit is LIFO)
+atexit.register(_span_writer.close)
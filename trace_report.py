@@ -0,0 +1,95 @@
+"""Latency report from the agent-loop traces (see src/core/tracing.py)
+
+Usage:
+    python trace_report.py                     p50/p95/p99 per model, tool, trader and DB write
+    python trace_report.py --by model,tool --hours 24
+    python trace_report.py --traces            latest sessions
+    python trace_report.py --trace <trace_id>  one session as a tree
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+from src.core.tracing import GROUPINGS, latency_report, read_trace, recent_traces, token_report
+
+TITLES = {
+    "model": "LLM calls per model",
+    "tool": "Tool calls per tool",
+    "trader": "Turns per trader",
+    "db": "DB writes per operation",
+}
+
+
+def print_latency(by: str, since: float):
+    rows = sorted(latency_report(by, since), key=lambda r: r["p95"], reverse=True)
+    print(f"\n{TITLES[by]}")
+    if not rows:
+        print("  (no spans)")
+        return
+    tokens = token_report(since) if by == "model" else {}
+    header = f"  {by:<32}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header + ("    tokens in/out" if tokens else ""))
+    for r in rows:
+        line = (f"  {r['key'][:31]:<32}{r['count']:>8}{r['errors']:>8}{r['p50']:>10.1f}{r['p95']:>10.1f}"
+                f"{r['p99']:>10.1f}{r['max']:>10.1f}")
+        if r["key"] in tokens:
+            t = tokens[r["key"]]
+            line += f"    {t['prompt_tokens']:,.0f}/{t['completion_tokens']:,.0f}"
+        print(line)
+
+
+def print_traces(limit: int):
+    for trace_id, name, started_at, duration_ms in recent_traces(limit):
+        started = datetime.fromtimestamp(started_at).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{trace_id}  {started}  {name:<20}{duration_ms / 1000:>8.2f}s")
+
+
+def print_trace(trace_id: str):
+    """Indented span tree with each span's duration and attributes"""
+    spans = read_trace(trace_id)
+    if not spans:
+        print(f"No spans for trace {trace_id}")
+        return
+    ids = {span[0] for span in spans}
+    children = {}
+    for span in spans:
+        # Spans whose parent is missing (pruned, or still in flight) print as roots
+        children.setdefault(span[1] if span[1] in ids else None, []).append(span)
+
+    def show(parent_id, depth):
+        for span_id, _, kind, name, duration_ms, status, attrs in children.get(parent_id, []):
+            extra = " ".join(f"{k}={v}" for k, v in json.loads(attrs).items())
+            flag = "" if status == "ok" else " ✗"
+            print(f"{'  ' * depth}{kind}:{name}  {duration_ms:.1f} ms{flag}  {extra}".rstrip())
+            show(span_id, depth + 1)
+
+    show(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent-loop latency percentiles from recorded spans")
+    parser.add_argument("--by", default=",".join(GROUPINGS),
+                        help="comma-separated reports: " + ", ".join(GROUPINGS))
+    parser.add_argument("--hours", type=float, help="only spans started in the last N hours")
+    parser.add_argument("--traces", type=int, nargs="?", const=10, help="list the latest N sessions")
+    parser.add_argument("--trace", help="print one trace as a tree")
+    args = parser.parse_args()
+
+    if args.trace:
+        print_trace(args.trace)
+    elif args.traces:
+        print_traces(args.traces)
+    else:
+        since = time.time() - args.hours * 3600 if args.hours else 0.0
+        for by in args.by.split(","):
+            if by not in GROUPINGS:
+                parser.error(f"unknown report {by!r}; choose from {', '.join(GROUPINGS)}")
+            print_latency(by, since)
+
+
+if __name__ == "__main__":
+    main()
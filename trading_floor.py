@@ -1,19 +1,33 @@
 """Trading floor orchestrator - runs all traders"""
 import asyncio
+import json
 import os
 import sys
-from typing import List
+import time
+from pathlib import Path
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.dirname(__file__))
-from src.agents.trader import SimpleTrader
+from src.agents.cassette import cassette
+from src.agents.limiter import ConcurrencyLimiter
+from src.agents.llm_clients import close_clients, connection_stats
+from src.agents.trader import PROVIDERS, SimpleTrader
+from src.core import async_database
+from src.core.database import log_stats, prune_events
+from src.core.logs import archive_logs
+from src.core.tracing import prune_spans, span
+from src.core.market import price_cache_stats
+from src.core.timeseries import prune_history
 
 load_dotenv()
 
 USE_MANY_MODELS = os.getenv("USE_MANY_MODELS", "false").lower() == "true"
 RUN_EVERY_N_MINUTES = int(os.getenv("RUN_EVERY_N_MINUTES", "60"))
+TRADERS_CONFIG = Path(os.getenv("TRADERS_CONFIG", "traders.json"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # per provider, unless configured
 
-# Trader configurations - using 3 different AI models
+# Default trader configurations (used when there is no TRADERS_CONFIG file) - 3 different AI models
 TRADERS = [
     {"name": "Warren", "model": "openai/gpt-4o-mini"},
     {"name": "George", "model": "google/gemini-2.0-flash-exp"},  
@@ -22,37 +36,133 @@ TRADERS = [
 ]
 
 
-def create_traders() -> List[SimpleTrader]:
+def load_config(path: Path = None) -> Dict[str, Any]:
+    """Read the floor config: traders plus per-provider limits
+
+    Entries with "count" expand into that many traders, "{i}" in the name
+    (and strategy) being replaced with the trader's index.
+    """
+    path = path or TRADERS_CONFIG
+    if path.exists():
+        with open(path) as f:
+            config = json.load(f)
+    else:
+        config = {"traders": TRADERS}
+    
+    traders, names = [], set()
+    for entry in config.get("traders", []):
+        if "name" not in entry or "model" not in entry:
+            raise ValueError(f"Trader config needs a name and a model: {entry}")
+        if entry.get("provider") and entry["provider"] not in PROVIDERS:
+            raise ValueError(f"Unknown provider {entry['provider']!r} for {entry['name']} (known: {', '.join(PROVIDERS)})")
+        count = entry.get("count")
+        for i in range(count) if count else [None]:
+            trader = {k: v for k, v in entry.items() if k != "count"}
+            if i is not None:
+                trader["name"] = entry["name"].replace("{i}", str(i)) if "{i}" in entry["name"] else f"{entry['name']}{i}"
+                if "strategy" in entry:
+                    trader["strategy"] = entry["strategy"].replace("{i}", str(i))
+            if trader["name"].lower() in names:
+                raise ValueError(f"Duplicate trader name: {trader['name']}")
+            names.add(trader["name"].lower())
+            traders.append(trader)
+    return {**config, "traders": traders}
+
+
+def create_limiter(config: Dict[str, Any]) -> ConcurrencyLimiter:
+    """Per-provider limiter from the config's "limits" section"""
+    return ConcurrencyLimiter(config.get("limits"), config.get("default_concurrency", LLM_MAX_CONCURRENCY))
+
+
+def create_traders(config: Dict[str, Any] = None, limiter: ConcurrencyLimiter = None) -> List[SimpleTrader]:
     """Create all trader instances"""
+    config = config or load_config()
+    limiter = limiter or create_limiter(config)
     traders = []
-    for config in TRADERS:
-        trader = SimpleTrader(config["name"], config["model"])
+    for entry in config["traders"]:
+        trader = SimpleTrader(
+            entry["name"],
+            entry["model"],
+            provider=entry.get("provider"),
+            strategy=entry.get("strategy"),
+            limiter=limiter
+        )
         traders.append(trader)
     return traders
 
 
-async def run_trading_session():
-    """Run one trading session for all traders"""
-    traders = create_traders()
+def print_limiter_stats(limiter: ConcurrencyLimiter):
+    """Queue wait per provider for the session's LLM requests"""
+    for provider, stats in limiter.stats().items():
+        print(f"{provider}: {stats['requests']} requests, max {stats['max_in_flight']}/{stats['concurrency']} in flight, "
+              f"queue wait p50 {stats['wait_p50']:.2f}s p95 {stats['wait_p95']:.2f}s max {stats['wait_max']:.2f}s")
+
+
+async def run_trading_session(config: Dict[str, Any] = None, limiter: ConcurrencyLimiter = None,
+                              traders: List[SimpleTrader] = None) -> Dict[str, Any]:
+    """Run one trading session for all traders (pass traders to watch their progress while it runs)"""
+    config = config or load_config()
+    limiter = limiter or create_limiter(config)
+    traders = traders or create_traders(config, limiter)
     
     print("\n" + "="*60)
-    print("🏦 AI TRADING SIMULATION - Session Starting")
+    print(f"🏦 AI TRADING SIMULATION - Session Starting ({len(traders)} traders)")
     print("="*60 + "\n")
     
-    # Run all traders in parallel
-    await asyncio.gather(*[trader.run() for trader in traders])
+    # Run all traders in parallel; the limiter bounds in-flight LLM requests
+    start = time.perf_counter()
+    try:
+        async with span("session", "trading_session", traders=len(traders)):
+            await asyncio.gather(*[trader.run() for trader in traders])
+    finally:
+        await async_database.close()
+    makespan = time.perf_counter() - start
+    pruned = await asyncio.to_thread(prune_history)
+    await asyncio.to_thread(prune_events)
+    await asyncio.to_thread(archive_logs)
+    await asyncio.to_thread(prune_spans)
     
+    stats = price_cache_stats()
     print("\n" + "="*60)
-    print("✅ Session Complete")
+    print(f"✅ Session Complete in {makespan:.1f}s")
+    print_limiter_stats(limiter)
+    if cassette.mode != "off":
+        tape = cassette.stats()
+        print(f"LLM cassette ({tape['mode']}): {tape['hits']} replayed, {tape['misses']} misses "
+              f"({tape['diverged']} diverged from the recording), {tape['recorded']} recorded")
+    for endpoint, conn in connection_stats().items():
+        print(f"{endpoint}: {conn['requests']} requests over {conn['connections']} connections "
+              f"({conn['reuse_rate']:.0%} reused, {conn['tls_handshakes']} TLS handshakes)")
+    print(f"Price cache: {stats['hits']} hits, {stats['misses']} misses, "
+          f"{stats['coalesced']} coalesced ({stats['hit_rate']:.0%} hit rate)")
+    logs = log_stats()
+    if logs["dropped"] or logs["retries"]:
+        print(f"Activity log: {logs['retries']} write retries, {logs['dropped']} lines dropped "
+              f"(last error: {logs['last_error']})")
+    if any(pruned.values()):
+        print("Pruned portfolio history: " + ", ".join(f"{n} {level}" for level, n in pruned.items() if n))
     print("="*60 + "\n")
+    return {"traders": len(traders), "makespan": makespan, "providers": limiter.stats()}
+
+
+async def run_once(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Run a single session and close the LLM connection pools with it"""
+    try:
+        return await run_trading_session(config)
+    finally:
+        await close_clients()
 
 
 async def run_continuous():
     """Run trading sessions continuously"""
-    while True:
-        await run_trading_session()
-        print(f"\n⏰ Next session in {RUN_EVERY_N_MINUTES} minutes...\n")
-        await asyncio.sleep(RUN_EVERY_N_MINUTES * 60)
+    # Sessions share one event loop, so keep-alive connections carry over
+    try:
+        while True:
+            await run_trading_session()
+            print(f"\n⏰ Next session in {RUN_EVERY_N_MINUTES} minutes...\n")
+            await asyncio.sleep(RUN_EVERY_N_MINUTES * 60)
+    finally:
+        await close_clients()
 
 
 if __name__ == "__main__":
@@ -60,7 +170,11 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1 and sys.argv[1] == "--once":
         # Run once for testing
-        asyncio.run(run_trading_session())
+        asyncio.run(run_once())
+    elif len(sys.argv) > 3 and sys.argv[1] == "--backtest":
+        # Replay historical dates back-to-back on a simulated clock
+        from backtest import main as run_backtest
+        run_backtest(sys.argv[2], sys.argv[3])
     else:
         # Run continuously
         print(f"Starting trading floor (sessions every {RUN_EVERY_N_MINUTES} minutes)")